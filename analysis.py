@@ -0,0 +1,553 @@
+import hashlib
+import re
+
+import numpy as np
+import pandas as pd
+
+from diagnostics import etapa
+
+HORAS_DIA = 24
+
+# Label columns of df_resultado, stored as categoricals
+COLUMNAS_CATEGORICAS = ["Usuario", "Comunidad", "Bono Usado"]
+
+# Rows matched per step by ``analizar_por_partes``
+TAMANO_PARTE = 200_000
+
+COLUMNAS_RESUMEN = [
+    "Usuario", "Bono Usado", "Comunidad", "Monto Total",
+    "Hora de carga", "Veces que usó el bono", "% del Total",
+]
+
+# (community, sender substring) pairs in priority order: a "Del usuario" value
+# containing several patterns belongs to the first one. Used when the spreadsheet
+# has no comunidades sheet.
+COMUNIDADES_POR_DEFECTO = (("Fenix", "Fenix"), ("Eros", "Eros"))
+
+# Senders already classified, per rule set; cleared when it grows past the limit
+_MAX_REMITENTES = 100_000
+_remitentes = {}
+
+
+def _parse_hora(valor):
+    try:
+        return int(str(valor).split(":")[0].strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_minimo(valor, default):
+    try:
+        return int(str(valor).strip()) if valor else default
+    except (TypeError, ValueError):
+        return default
+
+
+def parse_unicos(serie, **kwargs):
+    # Reports repeat the same few dates and times over and over, so parse each
+    # distinct value only once and broadcast back
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+    codigos, unicos = pd.factorize(serie)
+    parseados = pd.to_datetime(pd.Series(unicos, dtype=object), **kwargs).to_numpy()
+    # Missing values (code -1) pick the trailing NaT, also when nothing parsed at all
+    parseados = np.append(parseados, np.array("NaT", dtype=parseados.dtype))
+    return pd.Series(parseados[codigos], index=serie.index)
+
+
+def _formatear_unicos(serie, formato):
+    codigos, unicos = pd.factorize(serie)
+    textos = np.array([v.strftime(formato) for v in unicos.to_pydatetime()] + [""], dtype=object)
+    return textos[codigos]
+
+
+def _formatear_horas(serie):
+    # Time of day (timedelta since midnight) as HH:MM:SS; missing times become ""
+    codigos, unicos = pd.factorize(serie)
+    segundos = (unicos // pd.Timedelta(seconds=1)).astype("int64")
+    textos = np.array(
+        [f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}" for s in segundos] + [""], dtype=object
+    )
+    return textos[codigos]
+
+
+def _parse_porcentaje(valor):
+    try:
+        return float(str(valor).replace("%", "").replace(",", ".").strip())
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def version_frame(df):
+    """Content hash of a DataFrame, used to key caches on sheet revisions."""
+    huella = hashlib.sha1(repr(list(df.columns)).encode())
+    huella.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return huella.hexdigest()
+
+
+def compilar_bonos(bonos):
+    """Compile the bonos_ofrecidos sheet into a typed rule table.
+
+    One row per usable bonus, indexed by (fecha, comunidad) and ordered by sheet
+    position inside each key, since the last matching bonus in the sheet wins.
+    The raw percentage text is kept for the "Bono Usado" label.
+    """
+    columnas = ["Fecha", "Comunidad", "Hora inicio", "Hora fin"]
+    if bonos.empty or any(col not in bonos.columns for col in columnas):
+        bonos = pd.DataFrame(columns=columnas)
+
+    def _columna(nombre):
+        return bonos[nombre].tolist() if nombre in bonos.columns else [""] * len(bonos)
+
+    fechas = pd.Series([f if isinstance(f, str) else None for f in bonos["Fecha"]], dtype=object)
+    reglas = pd.DataFrame({
+        "fecha": pd.to_datetime(fechas, format="%d/%m/%Y", errors="coerce"),
+        "comunidad": pd.Series([c.lower() if isinstance(c, str) else None for c in bonos["Comunidad"]], dtype=object),
+        "h_ini": pd.array([_parse_hora(v) for v in bonos["Hora inicio"]], dtype="Int64"),
+        "h_fin": pd.array([_parse_hora(v) for v in bonos["Hora fin"]], dtype="Int64"),
+        "min_carga": pd.array([_parse_minimo(v, 0) for v in _columna("Mínimo carga")], dtype="int64"),
+        "min_mejorado": pd.array([_parse_minimo(v, None) or None for v in _columna("Mínimo mejorado")], dtype="Int64"),
+        "pct_base": [_parse_porcentaje(v) for v in _columna("Bono % base")],
+        "pct_mejorado": [_parse_porcentaje(v) for v in _columna("Bono % mejorado")],
+        "etiqueta_base": pd.Series([str(v) for v in _columna("Bono % base")], dtype=object),
+        "etiqueta_mejorado": pd.Series([str(v) for v in _columna("Bono % mejorado")], dtype=object),
+        "orden": np.arange(len(bonos), dtype="int64"),
+    })
+    reglas = reglas.dropna(subset=["fecha", "comunidad", "h_ini", "h_fin"])
+    reglas = reglas.astype({"h_ini": "int64", "h_fin": "int64"})
+    reglas = reglas.sort_values(["fecha", "comunidad", "orden"]).set_index(["fecha", "comunidad"])
+    return reglas
+
+
+def _expandir_por_hora(reglas):
+    # A deposit at hour h matches a bonus when h_ini <= h <= h_fin, so each bonus is
+    # expanded into one row per hour it covers and the hour becomes part of the join key.
+    h_ini = reglas["h_ini"].clip(lower=0).to_numpy()
+    h_fin = reglas["h_fin"].clip(upper=HORAS_DIA - 1).to_numpy()
+    n_horas = np.maximum(h_fin - h_ini + 1, 0)
+    idx = np.repeat(np.arange(len(reglas)), n_horas)
+    inicio = np.repeat(np.cumsum(n_horas) - n_horas, n_horas)
+    expandidas = pd.DataFrame({
+        "fecha": reglas.index.get_level_values("fecha").to_numpy().astype("datetime64[ns]")[idx],
+        "comunidad": reglas.index.get_level_values("comunidad").to_numpy(dtype=object)[idx].astype(str),
+        "hora": h_ini[idx] + (np.arange(len(idx)) - inicio),
+        "regla": reglas["regla"].to_numpy()[idx],
+    })
+    # A bonus applies once the deposit reaches the lower of its two minimums; the
+    # improved minimum only counts when it is set.
+    min_carga = reglas["min_carga"].to_numpy(dtype="float64")
+    min_mejorado = reglas["min_mejorado"].to_numpy(dtype="float64", na_value=np.nan)
+    umbral = np.where(np.isnan(min_mejorado), min_carga, np.fmin(min_carga, min_mejorado))
+    expandidas["umbral"] = umbral[idx]
+    return expandidas
+
+
+def asignar_bonos(fecha, comunidad, hora, monto, reglas):
+    """Return, per deposit, the position in ``reglas`` of the bonus it used (-1 if none)."""
+    n = len(monto)
+    ganadora = np.full(n, -1, dtype="int64")
+    if n == 0 or reglas.empty:
+        return ganadora
+
+    depositos = pd.DataFrame({
+        "fecha": np.asarray(fecha, dtype="datetime64[ns]"),
+        "comunidad": np.char.lower(np.asarray(comunidad, dtype=str)),
+        "hora": np.asarray(hora, dtype="int64"),
+        "umbral": np.asarray(monto, dtype="float64"),
+        "pos": np.arange(n),
+    })
+
+    # Only expand the bonuses for (fecha, comunidad) pairs that occur in the report
+    claves_reporte = pd.MultiIndex.from_frame(depositos[["fecha", "comunidad"]].drop_duplicates())
+    candidatas = reglas.assign(regla=np.arange(len(reglas)))
+    candidatas = candidatas[candidatas.index.isin(claves_reporte)]
+    if candidatas.empty:
+        return ganadora
+
+    expandidas = _expandir_por_hora(candidatas)
+    claves = ["fecha", "comunidad", "hora"]
+    # Sorted by threshold, the running max of the rule position gives, for any amount,
+    # the last bonus in the sheet whose threshold the amount reaches.
+    expandidas = expandidas.sort_values("umbral", kind="stable")
+    expandidas["ganadora"] = expandidas.groupby(claves, sort=False)["regla"].cummax()
+
+    cruce = pd.merge_asof(
+        depositos.sort_values("umbral", kind="stable"),
+        expandidas[claves + ["umbral", "ganadora"]],
+        on="umbral",
+        by=claves,
+        direction="backward",
+    )
+    encontrada = cruce["ganadora"].notna().to_numpy()
+    ganadora[cruce["pos"].to_numpy()[encontrada]] = cruce["ganadora"].to_numpy()[encontrada].astype("int64")
+    return ganadora
+
+
+def compilar_comunidades(tabla=None):
+    """Community rules ``((nombre, patron), ...)`` from the comunidades sheet.
+
+    One row per pattern with columns Comunidad and Patrón (the community name
+    when blank), in priority order. A missing or empty sheet gives
+    ``COMUNIDADES_POR_DEFECTO``.
+    """
+    if tabla is None or tabla.empty or "Comunidad" not in tabla.columns:
+        return COMUNIDADES_POR_DEFECTO
+    patrones = tabla["Patrón"] if "Patrón" in tabla.columns else pd.Series("", index=tabla.index)
+    reglas = []
+    for nombre, patron in zip(tabla["Comunidad"], patrones):
+        nombre = str(nombre).strip()
+        patron = str(patron).strip() or nombre
+        if nombre and (nombre, patron) not in reglas:
+            reglas.append((nombre, patron))
+    return tuple(reglas) or COMUNIDADES_POR_DEFECTO
+
+
+def nombres_comunidades(reglas_comunidad=COMUNIDADES_POR_DEFECTO):
+    """Distinct community names, in priority order."""
+    return list(dict.fromkeys(nombre for nombre, _ in reglas_comunidad))
+
+
+def _clasificar_remitentes(remitentes, reglas_comunidad):
+    # One alternative per pattern, each allowed to match anywhere in the sender.
+    # Alternatives are tried in order at the start of the string, so a single
+    # regex pass gives the highest-priority pattern the sender contains.
+    expresion = "(?s)^(?:" + "|".join(f".*?({re.escape(p)})" for _, p in reglas_comunidad) + ")"
+    grupos = pd.Series(remitentes, dtype=object).astype(str).str.extract(expresion).notna().to_numpy()
+    nombres = np.array([nombre for nombre, _ in reglas_comunidad] + [""], dtype=object)
+    return nombres[np.where(grupos.any(axis=1), grupos.argmax(axis=1), len(reglas_comunidad))]
+
+
+def detectar_comunidad(del_usuario, reglas_comunidad=COMUNIDADES_POR_DEFECTO):
+    """Community of each sender in ``del_usuario`` ("" when no pattern matches).
+
+    Each distinct sender is classified once and remembered across calls, so the
+    chunks of one report (and later reports from the same agents) skip it.
+    """
+    codigos, unicos = pd.factorize(del_usuario)
+    conocidos = _remitentes.setdefault(reglas_comunidad, {})
+    etiquetas = [conocidos.get(u) for u in unicos]
+    nuevos = [u for u, e in zip(unicos, etiquetas) if e is None]
+    if nuevos and reglas_comunidad:
+        clasificados = dict(zip(nuevos, _clasificar_remitentes(nuevos, reglas_comunidad)))
+        if len(conocidos) + len(clasificados) > _MAX_REMITENTES:
+            conocidos.clear()
+        conocidos.update(clasificados)
+        etiquetas = [clasificados[u] if e is None else e for u, e in zip(unicos, etiquetas)]
+    etiquetas = np.array([e or "" for e in etiquetas] + [""], dtype=object)
+    return pd.Series(etiquetas[codigos], index=del_usuario.index, dtype=object)
+
+
+def filtrar_reporte(df_reporte, fecha=None, comunidades=None, reglas_comunidad=COMUNIDADES_POR_DEFECTO):
+    """Keep only the report rows for ``fecha`` and ``comunidades`` (None means no filter).
+
+    Meant to run right after ingestion so that matching only sees the selected
+    rows. Dates and senders are parsed/classified once per distinct value.
+    """
+    if fecha is not None:
+        fechas = parse_unicos(df_reporte['Fecha'], errors='coerce').dt.normalize()
+        df_reporte = df_reporte[(fechas == pd.Timestamp(fecha)).to_numpy()]
+    if comunidades:
+        codigos, unicos = pd.factorize(df_reporte['Del usuario'])
+        coincide = detectar_comunidad(pd.Series(unicos, dtype=object), reglas_comunidad).isin(list(comunidades)).to_numpy()
+        # Missing senders (code -1) never match a community
+        df_reporte = df_reporte[np.append(coincide, False)[codigos]]
+    return df_reporte
+
+
+def clasificar_depositos(df_reporte, reglas, reglas_comunidad=COMUNIDADES_POR_DEFECTO):
+    """Build the per-deposit ``df_resultado`` table against a compiled rule table.
+
+    Columns are typed: Fecha is the day (datetime64), Hora de carga the time of day
+    (timedelta64) with its hour in Hora (int8), Participó a bool, Bono % the
+    numeric percentage, and Usuario/Comunidad/Bono Usado are categoricals.
+    ``formatear_resultado`` gives the text version for display and export.
+    """
+    # Convert and clean data
+    fecha = parse_unicos(df_reporte['Fecha'], errors='coerce')
+    tiempo = parse_unicos(df_reporte['Tiempo'], format="%H:%M:%S", errors='coerce')
+    validas = (fecha.notna() & tiempo.notna()).to_numpy()
+    fecha = fecha[validas].dt.normalize()
+    tiempo = tiempo[validas]
+    hora = tiempo.dt.hour.to_numpy(dtype="int64")
+    monto = pd.to_numeric(df_reporte['Depositar'][validas], errors='coerce').fillna(0).to_numpy(dtype="float64")
+    usuario = df_reporte['Al usuario'][validas].to_numpy()
+    comunidad = detectar_comunidad(df_reporte['Del usuario'][validas], reglas_comunidad)
+
+    ganadora = asignar_bonos(fecha, comunidad.to_numpy(), hora, monto, reglas)
+
+    # Pick the improved or base tier of the winning bonus. Labels are built once per
+    # distinct (bonus, tier, community) and the rows only keep a category code.
+    participo = ganadora >= 0
+    comunidad = comunidad.to_numpy()
+    codigo_bono = np.full(len(ganadora), -1, dtype="int64")
+    pct = np.full(len(ganadora), np.nan)
+    etiquetas = np.array([], dtype=object)
+    if participo.any():
+        idx = ganadora[participo]
+        min_mejorado = reglas["min_mejorado"].to_numpy(dtype="float64", na_value=np.nan)[idx]
+        mejorado = ~np.isnan(min_mejorado) & (monto[participo] >= min_mejorado)
+        pct[participo] = np.where(
+            mejorado,
+            reglas["pct_mejorado"].to_numpy(dtype="float64")[idx],
+            reglas["pct_base"].to_numpy(dtype="float64")[idx],
+        )
+        texto = np.where(
+            mejorado,
+            reglas["etiqueta_mejorado"].to_numpy(dtype=object)[idx],
+            reglas["etiqueta_base"].to_numpy(dtype=object)[idx],
+        )
+        codigos, claves = pd.factorize(pd.MultiIndex.from_arrays([texto, comunidad[participo]]))
+        etiquetas = np.array([f"{t}% ({c})" for t, c in claves], dtype=object)
+        codigo_bono[participo] = codigos
+    bono_usado = np.append(etiquetas, "No")[codigo_bono]
+
+    return pd.DataFrame({
+        "Fecha": fecha.to_numpy(),
+        "Usuario": pd.Categorical(usuario),
+        "Comunidad": pd.Categorical(comunidad),
+        "Monto": monto,
+        "Hora de carga": (tiempo - tiempo.dt.normalize()).to_numpy(),
+        "Bono Usado": pd.Categorical(bono_usado),
+        "Participó": participo,
+        "Hora": hora.astype("int8"),
+        "Bono %": pct,
+    })
+
+
+def concatenar_resultados(partes):
+    """Stack ``df_resultado`` pieces, keeping the label columns categorical."""
+    df_resultado = pd.concat(partes, ignore_index=True)
+    return df_resultado.astype({col: "category" for col in COLUMNAS_CATEGORICAS})
+
+
+def formatear_resultado(df_resultado):
+    """``df_resultado`` as shown and exported: dd/mm/YYYY, HH:MM:SS and ✅/❌ text."""
+    return pd.DataFrame({
+        "Fecha": _formatear_unicos(df_resultado["Fecha"], "%d/%m/%Y"),
+        "Usuario": df_resultado["Usuario"].to_numpy(dtype=object),
+        "Comunidad": df_resultado["Comunidad"].to_numpy(dtype=object),
+        "Monto": df_resultado["Monto"].to_numpy(),
+        "Hora de carga": _formatear_horas(df_resultado["Hora de carga"]),
+        "Bono Usado": df_resultado["Bono Usado"].to_numpy(dtype=object),
+        "Participó": np.where(df_resultado["Participó"], "✅", "❌"),
+    }, index=df_resultado.index)
+
+
+def formatear_resumen(resumen):
+    """``resumen`` (or a ``resumen_diario`` frame) with text times, dates and percentages."""
+    texto = resumen.copy()
+    if "Fecha" in texto.columns and pd.api.types.is_datetime64_any_dtype(texto["Fecha"]):
+        texto["Fecha"] = _formatear_unicos(texto["Fecha"], "%d/%m/%Y")
+    if pd.api.types.is_timedelta64_dtype(texto["Hora de carga"]):
+        texto["Hora de carga"] = _formatear_horas(texto["Hora de carga"])
+    if pd.api.types.is_numeric_dtype(texto["% del Total"]):
+        # Non-participants and days whose total is 0 (no share: NaN) print "0%", as
+        # completar_resumen did before it was typed
+        con_parte = (texto["Bono Usado"] != "No") & texto["% del Total"].notna()
+        porcentaje = texto["% del Total"].astype(str) + "%"
+        texto["% del Total"] = porcentaje.where(con_parte, "0%")
+    return texto
+
+
+def agregar_participacion(df_resultado):
+    """Per (user, bonus, community) totals, before the % column and the non-participants."""
+    # Agrupación por usuario y bono
+    resumen = df_resultado[df_resultado["Participó"]].groupby(['Usuario', 'Bono Usado', 'Comunidad'], as_index=False, observed=True).agg({
+        'Monto': 'sum',
+        'Hora de carga': 'last',
+        'Participó': 'count'
+    })
+    resumen.rename(columns={
+        'Monto': 'Monto Total',
+        'Participó': 'Veces que usó el bono'
+    }, inplace=True)
+    # One row per user and bonus: plain labels are cheaper here than categoricals
+    return resumen.astype({'Usuario': object, 'Bono Usado': object, 'Comunidad': object})
+
+
+def combinar_parciales(parciales):
+    """Merge partial aggregates computed over consecutive slices of one report."""
+    parciales = [p for p in parciales if not p.empty]
+    if not parciales:
+        return agregar_participacion(pd.DataFrame({
+            "Usuario": pd.Series(dtype=object),
+            "Bono Usado": pd.Series(dtype=object),
+            "Comunidad": pd.Series(dtype=object),
+            "Monto": pd.Series(dtype="float64"),
+            "Hora de carga": pd.Series(dtype="timedelta64[ns]"),
+            "Participó": pd.Series(dtype=bool),
+        }))
+    if len(parciales) == 1:
+        return parciales[0]
+    # Slices are in report order, so the last slice's "Hora de carga" is the group's last
+    resumen = pd.concat(parciales, ignore_index=True).groupby(['Usuario', 'Bono Usado', 'Comunidad'], as_index=False).agg({
+        'Monto Total': 'sum',
+        'Hora de carga': 'last',
+        'Veces que usó el bono': 'sum'
+    })
+    # Same key dtypes as a single agregar_participacion
+    return resumen.astype({'Usuario': object, 'Bono Usado': object, 'Comunidad': object})
+
+
+def completar_resumen(resumen, vip_list):
+    # % sobre el total
+    total_general = resumen['Monto Total'].sum() if not resumen.empty else 0
+    if total_general > 0:
+        resumen['% del Total'] = (resumen['Monto Total'] / total_general * 100).round(2)
+    else:
+        # No share of a zero total; formatear_resumen shows it as "0%"
+        resumen['% del Total'] = np.nan
+
+    # Agregar los usuarios que no participaron: one anti-join against the set of users
+    # with data, compared as text because the report may be read with string dtypes
+    # while get_all_records returns numeric user ids
+    usuarios = vip_list['usuario']
+    con_datos = pd.Index(resumen['Usuario'].astype(str).unique())
+    faltantes = usuarios[~usuarios.astype(str).isin(con_datos)].to_numpy()
+    if len(faltantes):
+        ceros = pd.DataFrame({
+            "Usuario": faltantes,
+            "Bono Usado": "No",
+            "Comunidad": "",
+            "Monto Total": 0.0,
+            "Hora de carga": np.full(len(faltantes), np.timedelta64("NaT"), dtype="timedelta64[ns]"),
+            "Veces que usó el bono": 0,
+            "% del Total": 0.0
+        })
+        resumen = pd.concat([resumen, ceros], ignore_index=True) if not resumen.empty else ceros
+
+    return resumen
+
+
+def resumen_diario(df_resultado, vip_list):
+    """One ``resumen`` per report day, stacked with a leading Fecha (datetime) column."""
+    return resumen_por_dia(
+        {fecha: [agregar_participacion(del_dia)] for fecha, del_dia in df_resultado.groupby("Fecha", sort=False)},
+        vip_list,
+    )
+
+
+def resumen_por_dia(parciales, vip_list):
+    """``resumen_diario`` from ``{day: [partial aggregates]}`` gathered slice by slice."""
+    dias = []
+    for fecha, del_dia in parciales.items():
+        resumen = completar_resumen(combinar_parciales(del_dia), vip_list)
+        resumen.insert(0, "Fecha", fecha)
+        dias.append(resumen)
+    if not dias:
+        return pd.DataFrame(columns=["Fecha"] + COLUMNAS_RESUMEN)
+    return pd.concat(dias, ignore_index=True)
+
+
+def analizar_participacion(df_reporte, vip_list, bonos, reglas=None, reglas_comunidad=COMUNIDADES_POR_DEFECTO):
+    if reglas is None:
+        reglas = compilar_bonos(bonos)
+    with etapa("matching", filas=len(df_reporte)):
+        df_resultado = clasificar_depositos(df_reporte, reglas, reglas_comunidad)
+    with etapa("summary") as medicion:
+        resumen = completar_resumen(agregar_participacion(df_resultado), vip_list)
+        medicion["filas"] = len(resumen)
+    return df_resultado, resumen
+
+
+def _clasificar_por_partes(df_reporte, reglas, reglas_comunidad, al_avanzar, tamano):
+    # df_resultado and the combined partial aggregates of consecutive row slices
+    total = len(df_reporte)
+    partes, parciales = [], []
+    with etapa("matching", filas=total):
+        # The same dates and times recur in every slice: parse the distinct values
+        # once for the whole report so the slices only factorize timestamps
+        df_reporte = df_reporte.assign(
+            Fecha=parse_unicos(df_reporte['Fecha'], errors='coerce'),
+            Tiempo=parse_unicos(df_reporte['Tiempo'], format="%H:%M:%S", errors='coerce'),
+        )
+        for inicio in range(0, max(total, 1), tamano):
+            parte = clasificar_depositos(df_reporte.iloc[inicio:inicio + tamano], reglas, reglas_comunidad)
+            partes.append(parte)
+            parciales.append(agregar_participacion(parte))
+            if al_avanzar is not None:
+                al_avanzar(min(inicio + tamano, total), total)
+        df_resultado = concatenar_resultados(partes)
+    return df_resultado, combinar_parciales(parciales)
+
+
+def analizar_por_partes(df_reporte, vip_list, bonos, reglas=None, reglas_comunidad=COMUNIDADES_POR_DEFECTO,
+                        al_avanzar=None, tamano=TAMANO_PARTE):
+    """``analizar_participacion`` over consecutive row slices, reporting progress.
+
+    ``al_avanzar(filas_hechas, filas_totales)`` is called after every slice; an
+    exception raised from it (e.g. a cancellation) stops the analysis there. The
+    result is the same as ``analizar_participacion``'s.
+    """
+    if reglas is None:
+        reglas = compilar_bonos(bonos)
+    df_resultado, parcial = _clasificar_por_partes(df_reporte, reglas, reglas_comunidad, al_avanzar, tamano)
+    with etapa("summary") as medicion:
+        resumen = completar_resumen(parcial, vip_list)
+        medicion["filas"] = len(resumen)
+    return df_resultado, resumen
+
+
+def huellas_filas(df_reporte):
+    """Fingerprint (uint64) of every report row, stable across exports.
+
+    Each column's distinct values are hashed once and mixed per row; identical
+    rows (genuine repeated deposits) get their occurrence number mixed in too, so
+    every fingerprint in a report is distinct.
+    """
+    huellas = np.zeros(len(df_reporte), dtype="uint64")
+    for columna in df_reporte.columns:
+        serie = df_reporte[columna]
+        codigos, unicos = pd.factorize(serie)
+        # Amounts read as int64 from one export and float64 from the next (once it
+        # holds a decimal) must hash alike, so numbers are hashed as float64
+        numerica = pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie)
+        unicos = np.asarray(unicos, dtype="float64" if numerica else object)
+        # Missing values (code -1) hash to the appended 0
+        valores = np.append(pd.util.hash_array(unicos), np.uint64(0))[codigos]
+        huellas = huellas * np.uint64(0x100000001B3) ^ valores
+    serie = pd.Series(huellas)
+    repetidas = serie.duplicated(keep=False).to_numpy()
+    if repetidas.any():
+        ocurrencia = serie[repetidas].groupby(huellas[repetidas], sort=False).cumcount().to_numpy(dtype="uint64")
+        huellas[repetidas] += ocurrencia * np.uint64(0x9E3779B97F4A7C15)
+    return huellas
+
+
+def analizar_incremental(df_reporte, vip_list, bonos, reglas=None, reglas_comunidad=COMUNIDADES_POR_DEFECTO,
+                         previo=None, al_avanzar=None, tamano=TAMANO_PARTE):
+    """``analizar_por_partes`` that only matches the rows an earlier run hasn't seen.
+
+    ``previo`` is the ``estado`` returned by a run over an earlier export of the
+    same report. When ``df_reporte`` still holds every row of it, only the new
+    rows are matched and their aggregates are merged into the previous ones; new
+    rows count as coming after the old ones, as in an appended export. Otherwise
+    the whole report is analyzed. Returns ``(df_resultado, resumen, estado,
+    filas_nuevas)``.
+    """
+    if reglas is None:
+        reglas = compilar_bonos(bonos)
+    with etapa("fingerprint", filas=len(df_reporte)):
+        huellas = huellas_filas(df_reporte)
+        vistas = pd.Series(huellas).isin(previo["huellas"]).to_numpy() if previo is not None else None
+        # Fingerprints are distinct, so finding all of the previous ones means the
+        # report extends the earlier export
+        if vistas is not None and vistas.sum() == len(previo["huellas"]):
+            nuevas = ~vistas
+        else:
+            previo = None
+            nuevas = np.ones(len(huellas), dtype=bool)
+    df_nuevo, parcial = _clasificar_por_partes(df_reporte[nuevas], reglas, reglas_comunidad, al_avanzar, tamano)
+    if previo is not None and nuevas.any():
+        df_resultado = concatenar_resultados([previo["df_resultado"], df_nuevo])
+        parcial = combinar_parciales([previo["parcial"], parcial])
+    elif previo is not None:
+        df_resultado, parcial = previo["df_resultado"], previo["parcial"]
+    else:
+        df_resultado = df_nuevo
+    with etapa("summary") as medicion:
+        # The partial aggregates are kept in the state: complete a copy
+        resumen = completar_resumen(parcial.copy(), vip_list)
+        medicion["filas"] = len(resumen)
+    estado = {"huellas": huellas, "parcial": parcial, "df_resultado": df_resultado}
+    return df_resultado, resumen, estado, int(nuevas.sum())
@@ -1,11 +1,43 @@
 import streamlit as st
 import pandas as pd
 import datetime
+import hashlib
+import io
+import os
+import sqlite3
 import gspread
-import plotly.express as px
-import plotly.graph_objects as go
 from google.oauth2.service_account import Credentials
 
+from analysis import (
+    COMUNIDADES_POR_DEFECTO,
+    analizar_incremental,
+    compilar_bonos,
+    compilar_comunidades,
+    filtrar_reporte,
+    formatear_resultado,
+    formatear_resumen,
+    nombres_comunidades,
+    resumen_diario,
+    version_frame,
+)
+from cache import cache_compartida
+from charts import FIGURAS, calcular_agregados, figura_tendencia
+from diagnostics import ACTIVADO_POR_DEFECTO, etapa, iniciar_corrida, terminar_corrida
+from exports import FORMATOS, exportar
+from history import (
+    bonos_vip,
+    comunidades_historial,
+    guardar_historial,
+    rango_historial,
+    tendencia_comunidad,
+    tendencia_vip,
+)
+from ingestion import UMBRAL_BLOQUES, analizar_csv_por_bloques, aviso_conversion, leer_reporte, sumar_fallos
+from jobs import MAX_TRABAJOS, enviar, posicion_en_cola
+from sheets import HOJA_ACTIVIDAD, NOMBRE_LIBRO, abrir_hojas, cargar_referencias, exportar_actividad
+from storage import archivos_vigentes, dias_guardados, guardar_reporte, leer_archivos
+from tables import TAMANO_PAGINA, TablaPaginada
+
 # --- THEME CONFIGURATION ---
 st.set_page_config(
     page_title="VIP Analysis Dashboard",
@@ -127,16 +159,14 @@ with st.sidebar:
     st.markdown("---")
     
     st.markdown("### 📅 Date Filter")
-    today = datetime.date.today()
-    default_date = today
-    selected_date = st.date_input("Select Date", default_date)
+    selected_date = st.date_input("Select Date", value=None, help="Leave empty to include every day in the report")
     
     st.markdown("### 🏆 Community Filter")
-    community_filter = st.multiselect(
-        "Select Communities",
-        ["All", "Fenix", "Eros"],
-        default="All"
-    )
+    # Filled in once the reference data (and its community list) is loaded
+    contenedor_comunidades = st.container()
+    
+    st.markdown("### 🩺 Diagnostics")
+    diagnostico = st.toggle("Record stage timings", value=ACTIVADO_POR_DEFECTO, key="diagnostico")
     
     st.markdown("---")
     st.markdown("### 📊 Dashboard Info")
@@ -152,248 +182,600 @@ with st.sidebar:
         4. Download the results as CSV
         """)
 
+# Stage timings of this rerun; None (and no overhead) unless diagnostics are on
+corrida = iniciar_corrida(diagnostico)
+
 # --- GOOGLE SHEETS CONNECTION ---
 @st.cache_resource
 def connect_to_sheets():
     scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
     credentials = Credentials.from_service_account_info(st.secrets["gcp_service_account"], scopes=scope)
     gc = gspread.authorize(credentials)
-    sh = gc.open("seguimiento_vip")
-    return sh
+    sh = gc.open(NOMBRE_LIBRO)
+    # Worksheet handles are resolved once here instead of on every rerun
+    return sh, abrir_hojas(sh)
 
 try:
-    sh = connect_to_sheets()
-    hoja_vips = sh.worksheet("vip_list")
-    hoja_bonos = sh.worksheet("bonos_ofrecidos")
-    hoja_actividad = sh.worksheet("actividad_diaria_vip")
+    sh, hojas = connect_to_sheets()
+    hoja_actividad = hojas[HOJA_ACTIVIDAD]
     connection_error = False
 except Exception as e:
     connection_error = True
+    sh = hoja_actividad = None
+    hojas = {}
     st.error(f"Error connecting to Google Sheets: {e}")
 
 # --- DATA LOADING FUNCTIONS ---
-@st.cache_data(ttl=300)
+# The revision check runs at most once a minute; the sheets themselves are only
+# downloaded when the spreadsheet changed, otherwise the local snapshot is used
+@st.cache_data(ttl=60, show_spinner=False)
+def cargar_referencias_cache():
+    with etapa("sheets_fetch") as medicion:
+        vip_list, bonos, comunidades, estado = cargar_referencias(sh, titulos=list(hojas))
+        medicion["filas"] = len(vip_list) + len(bonos)
+    return vip_list, bonos, comunidades, estado
+
 def cargar_data():
-    vip_list = pd.DataFrame(hoja_vips.get_all_records())
-    bonos = pd.DataFrame(hoja_bonos.get_all_records())
+    vip_list, bonos, _, _ = cargar_referencias_cache()
     return vip_list, bonos
 
-def analizar_participacion(df_reporte, vip_list, bonos):
-    # Convert and clean data
-    df_reporte['Fecha'] = pd.to_datetime(df_reporte['Fecha'], errors='coerce')
-    df_reporte['Tiempo'] = pd.to_datetime(df_reporte['Tiempo'], format="%H:%M:%S", errors='coerce')
-    df_reporte['Hora'] = df_reporte['Tiempo'].dt.hour
-    df_reporte['Depositar'] = pd.to_numeric(df_reporte['Depositar'], errors='coerce').fillna(0)
-    df_reporte = df_reporte.dropna(subset=['Fecha', 'Hora'])
-
-    resultados = []
-
-    for _, row in df_reporte.iterrows():
-        usuario = row['Al usuario']
-        del_usuario = row['Del usuario']
-        hora = row['Hora']
-        monto = row['Depositar']
-        fecha = row['Fecha'].date()
-        tiempo = row['Tiempo'].strftime("%H:%M:%S")
-
-        comunidad = ""
-        if "Fenix" in del_usuario:
-            comunidad = "Fenix"
-        elif "Eros" in del_usuario:
-            comunidad = "Eros"
-
-        bonos_del_dia = bonos[(bonos['Fecha'] == fecha.strftime("%d/%m/%Y")) &
-                              (bonos['Comunidad'].str.lower() == comunidad.lower())]
-        participo = False
-        bono_usado = "No"
-
-        for _, b in bonos_del_dia.iterrows():
-            try:
-                h_ini = int(str(b['Hora inicio']).split(":")[0].strip())
-                h_fin = int(str(b['Hora fin']).split(":")[0].strip())
-            except:
-                continue
-
-            try:
-                min_carga = int(str(b['Mínimo carga']).strip()) if b['Mínimo carga'] else 0
-            except:
-                min_carga = 0
-
-            try:
-                min_mejorado = int(str(b['Mínimo mejorado']).strip()) if b['Mínimo mejorado'] else None
-            except:
-                min_mejorado = None
-
-            bono_tipo = str(b.get('Tipo bono', '')).lower()
-
-            if h_ini <= hora <= h_fin:
-                if min_mejorado and monto >= min_mejorado:
-                    participo = True
-                    bono_usado = f"{b['Bono % mejorado']}% ({comunidad})"
-                elif monto >= min_carga:
-                    participo = True
-                    bono_usado = f"{b['Bono % base']}% ({comunidad})"
-
-        resultados.append({
-            "Fecha": fecha.strftime("%d/%m/%Y"),
-            "Usuario": usuario,
-            "Comunidad": comunidad,
-            "Monto": monto,
-            "Hora de carga": tiempo,
-            "Bono Usado": bono_usado,
-            "Participó": "✅" if participo else "❌"
-        })
-
-    df_resultado = pd.DataFrame(resultados)
-
-    # Agrupación por usuario y bono
-    resumen = df_resultado[df_resultado["Participó"] == "✅"].groupby(['Usuario', 'Bono Usado', 'Comunidad'], as_index=False).agg({
-        'Monto': 'sum',
-        'Hora de carga': 'last',
-        'Participó': 'count'
-    })
-    resumen.rename(columns={
-        'Monto': 'Monto Total',
-        'Participó': 'Veces que usó el bono'
-    }, inplace=True)
-
-    # % sobre el total
-    total_general = resumen['Monto Total'].sum() if not resumen.empty else 0
-    if total_general > 0:
-        resumen['% del Total'] = (resumen['Monto Total'] / total_general * 100).round(2).astype(str) + "%"
+def cargar_comunidades():
+    _, _, comunidades, _ = cargar_referencias_cache()
+    return compilar_comunidades(comunidades)
+
+# Compiled once per bonos_ofrecidos revision and shared by every session
+@st.cache_data(max_entries=8)
+def compilar_reglas(version_bonos, _bonos):
+    return compilar_bonos(_bonos)
+
+try:
+    reglas_comunidad = cargar_comunidades()
+except Exception:
+    reglas_comunidad = COMUNIDADES_POR_DEFECTO
+
+with contenedor_comunidades:
+    community_filter = st.multiselect(
+        "Select Communities",
+        ["All"] + nombres_comunidades(reglas_comunidad),
+        default="All"
+    )
+
+# --- REPORT PROCESSING ---
+def huella_archivo(archivo):
+    # Hash the upload once per file_id; reruns reuse the stored digest
+    huellas = st.session_state.setdefault("huellas_archivo", {})
+    if archivo.file_id not in huellas:
+        huellas[archivo.file_id] = hashlib.sha256(archivo.getvalue()).hexdigest()
+    return huellas[archivo.file_id]
+
+def filtros_sidebar():
+    # None means "no filter"; "All" (or an empty selection) keeps every community
+    comunidades = None if not community_filter or "All" in community_filter else tuple(sorted(community_filter))
+    return selected_date, comunidades
+
+def analizar_en_segundo_plano(trabajo, clave, cargar_reporte, vip_list, bonos, reglas, diagnostico):
+    # Runs on a jobs.py worker thread: no Streamlit calls in here, warnings go to
+    # trabajo.avisos and stage timings to a run of their own. The parsed report and
+    # the result go to the shared cache, where every session finds them.
+    origen, fecha, comunidades, _, _, reglas_comunidad = clave
+    corrida = iniciar_corrida(diagnostico)
+    # The parsed report is reused when only the filters or reference data changed
+    df_reporte = cache_compartida.obtener(("reporte", origen))
+    if df_reporte is None:
+        trabajo.avanzar("Reading the report")
+        df_reporte = cargar_reporte(trabajo)
+        cache_compartida.guardar(("reporte", origen), df_reporte)
+    aviso = aviso_conversion(df_reporte.attrs.get("fallos_conversion"))
+    if aviso is not None:
+        trabajo.avisos.append(aviso)
+    # Filters are pushed down to the raw report rows, ahead of matching
+    trabajo.avanzar("Filtering")
+    with etapa("filter") as medicion:
+        df_filtrado = filtrar_reporte(df_reporte, fecha, comunidades, reglas_comunidad)
+        medicion["filas"] = len(df_filtrado)
+    # Ops re-export the day several times and each export extends the previous one,
+    # so the matching state of the last export of the same day (same filters and
+    # reference data) lets a re-upload match only the rows it adds
+    primer_dia = df_filtrado["Fecha"].min()
+    clave_estado = ("incremental", None if pd.isna(primer_dia) else primer_dia.normalize()) + clave[1:]
+    df_resultado, resumen, estado, filas_nuevas = analizar_incremental(
+        df_filtrado, vip_list, bonos, reglas, reglas_comunidad,
+        previo=cache_compartida.obtener(clave_estado),
+        al_avanzar=lambda hechas, total: trabajo.avanzar("Matching deposits", hechas, total),
+    )
+    cache_compartida.guardar(clave_estado, estado)
+    return _terminar_analisis(trabajo, clave, corrida, vip_list, df_resultado, resumen, len(df_filtrado), filas_nuevas)
+
+def analizar_en_bloques(trabajo, clave, archivo, vip_list, bonos, reglas, diagnostico):
+    # Large CSV uploads: read, filtered and matched a chunk at a time, so the raw
+    # report is never held whole. It is therefore not stored for re-analysis nor
+    # kept for a later incremental re-upload.
+    _, fecha, comunidades, _, _, reglas_comunidad = clave
+    corrida = iniciar_corrida(diagnostico)
+    # Own reader over the upload's bytes, so concurrent jobs don't share a position
+    origen = io.BytesIO(archivo.getvalue())
+    megas = max(len(origen.getbuffer()) // 2**20, 1)
+    fallos = {}
+
+    def _al_bloque(bloque, _):
+        sumar_fallos(fallos, bloque)
+        trabajo.avanzar("Reading and matching the report", min(origen.tell() // 2**20, megas), megas, "MB")
+
+    df_resultado, resumen = analizar_csv_por_bloques(
+        origen, vip_list, bonos, reglas, conservar_detalle=True,
+        fecha=fecha, comunidades=comunidades, reglas_comunidad=reglas_comunidad, al_bloque=_al_bloque,
+    )
+    aviso = aviso_conversion(fallos)
+    if aviso is not None:
+        trabajo.avisos.append(aviso)
+    trabajo.avisos.append(
+        f"The report ({megas:,} MB) was analyzed in chunks to bound memory; it was not stored for re-analysis."
+    )
+    return _terminar_analisis(trabajo, clave, corrida, vip_list, df_resultado, resumen, len(df_resultado), len(df_resultado))
+
+def _terminar_analisis(trabajo, clave, corrida, vip_list, df_resultado, resumen, filas, filas_nuevas):
+    comunidades = clave[2]
+    # Every analyzed day goes to the local history; a community-filtered run only
+    # covers part of each day, so it is not stored
+    if comunidades is None:
+        trabajo.avanzar("Storing the history")
+        try:
+            with etapa("store_history", filas=len(df_resultado)):
+                guardar_historial(resumen_diario(df_resultado, vip_list))
+        except (OSError, sqlite3.Error) as e:
+            trabajo.avisos.append(f"Could not store the results in the local history: {e}")
+    # Rollups for every tab, computed once here instead of on each rerun
+    trabajo.avanzar("Computing the charts data")
+    with etapa("rollups", filas=len(df_resultado)):
+        agregados = calcular_agregados(resumen, df_resultado)
+    terminar_corrida()
+    analisis = {
+        "clave": clave,
+        # Short content version used to key the figure cache
+        "version": hashlib.sha1(repr(clave).encode()).hexdigest(),
+        "df_resultado": df_resultado,
+        "resumen": resumen,
+        "agregados": agregados,
+        "filas": filas,
+        "filas_nuevas": filas_nuevas,
+    }
+    cache_compartida.guardar(("analisis", clave), analisis)
+    return {"analisis": analisis, "etapas": corrida.etapas if corrida is not None else []}
+
+def analizar_en_sesion(origen, funcion, fuente):
+    # Results are keyed by where the report came from (upload content hash or stored
+    # day range), the sidebar filters and the VIP/bonus data versions. The session
+    # keeps a reference to its current result so widget reruns don't redo the work;
+    # other sessions with the same key are served from the shared cache. The work
+    # runs as a background job; None is returned until a later rerun finds it done.
+    vip_list, bonos = cargar_data()
+    fecha, comunidades = filtros_sidebar()
+    clave = (origen, fecha, comunidades, version_frame(vip_list), version_frame(bonos), reglas_comunidad)
+
+    analisis = st.session_state.get("analisis")
+    if analisis is not None and analisis["clave"] == clave:
+        return analisis
+
+    trabajo = st.session_state.get("trabajo")
+    if trabajo is not None and (trabajo.clave != clave or trabajo.estado == "cancelled"):
+        trabajo.cancelar()
+        del st.session_state["trabajo"]
+        trabajo = None
+    if trabajo is None:
+        if st.session_state.get("cancelado") == clave:
+            return None
+        analisis = cache_compartida.obtener(("analisis", clave))
+        if analisis is not None:
+            st.session_state["analisis"] = analisis
+            return analisis
+        st.session_state.pop("cancelado", None)
+        st.session_state["trabajo"] = enviar(
+            clave, funcion, clave, fuente, vip_list, bonos,
+            compilar_reglas(clave[4], bonos), corrida is not None,
+        )
+        return None
+    if trabajo.estado == "failed":
+        # Dropped so the next rerun tries again
+        del st.session_state["trabajo"]
+        raise trabajo.error
+    if trabajo.estado != "done":
+        return None
+
+    del st.session_state["trabajo"]
+    for aviso in trabajo.avisos:
+        st.warning(aviso)
+    if corrida is not None:
+        corrida.etapas.extend(trabajo.resultado["etapas"])
+    analisis = trabajo.resultado["analisis"]
+    st.session_state["analisis"] = analisis
+    return analisis
+
+def procesar_reporte(archivo):
+    huella = huella_archivo(archivo)
+
+    def _leer_y_guardar(trabajo):
+        with etapa("read_report") as medicion:
+            df_reporte = leer_reporte(archivo)
+            medicion["filas"] = len(df_reporte)
+        # Keep a normalized copy so the day can be re-analyzed without re-uploading
+        trabajo.avanzar("Storing the report")
+        try:
+            with etapa("store_report", filas=len(df_reporte)):
+                guardar_reporte(df_reporte, huella)
+        except OSError as e:
+            trabajo.avisos.append(f"Could not store the report locally: {e}")
+        return df_reporte
+
+    if archivo.name.lower().endswith(".csv") and archivo.size > UMBRAL_BLOQUES:
+        return analizar_en_sesion(huella, analizar_en_bloques, archivo)
+    return analizar_en_sesion(huella, analizar_en_segundo_plano, _leer_y_guardar)
+
+def procesar_almacen(desde, hasta):
+    # A selected day inside the range means only that day's file has to be read
+    if selected_date is not None and desde <= selected_date <= hasta:
+        desde = hasta = selected_date
+
+    # The key names the files that are read (each day's newest export, with its
+    # mtime and size), so a day re-exported since then is analyzed afresh rather
+    # than served from the caches
+    archivos = archivos_vigentes(desde, hasta)
+    firma = tuple((ruta, os.path.getmtime(ruta), os.path.getsize(ruta)) for ruta in archivos)
+
+    def _leer_almacen(trabajo):
+        with etapa("read_store") as medicion:
+            df_reporte = leer_archivos(archivos)
+            medicion["filas"] = len(df_reporte)
+        return df_reporte
+
+    return analizar_en_sesion(("almacen", desde, hasta, firma), analizar_en_segundo_plano, _leer_almacen)
+
+def seleccionar_almacen():
+    rango = st.session_state["rango_almacen_input"]
+    if len(rango) == 2:
+        st.session_state["rango_almacen"] = tuple(rango)
+
+# The uploader lives in the Upload tab, but its value is read here so every tab
+# below sees the results on the same rerun. A fresh upload takes precedence over a
+# stored day range picked for re-analysis.
+archivo = st.session_state.get("archivo_reporte")
+rango_almacen = st.session_state.get("rango_almacen")
+analisis = None
+error_reporte = None
+if archivo is not None or rango_almacen is not None:
+    try:
+        analisis = procesar_reporte(archivo) if archivo is not None else procesar_almacen(*rango_almacen)
+    except Exception as e:
+        error_reporte = e
+else:
+    st.session_state.pop("analisis", None)
+    st.session_state.pop("cancelado", None)
+    trabajo = st.session_state.pop("trabajo", None)
+    if trabajo is not None:
+        trabajo.cancelar()
+
+# Polls the background job; once it is done the whole page reruns to pick it up
+@st.fragment(run_every=1)
+def progreso_trabajo():
+    trabajo = st.session_state.get("trabajo")
+    if trabajo is None:
+        return
+    if trabajo.terminado:
+        st.rerun()
+    if trabajo.estado == "pending":
+        # Every worker is busy with other analyses; this one starts when one frees up
+        delante = posicion_en_cola(trabajo)
+        cola = f" behind {delante} other {'analysis' if delante == 1 else 'analyses'}" if delante else ""
+        st.progress(0.0, text=f"🕒 Queued{cola}: all {MAX_TRABAJOS} workers are busy · {trabajo.segundos:.0f} s")
     else:
-        resumen['% del Total'] = "0%"
-
-    # Agregar los usuarios que no participaron
-    usuarios_con_datos = resumen['Usuario'].unique() if not resumen.empty else []
-    for jugador in vip_list['usuario']:
-        if jugador not in usuarios_con_datos:
-            resumen = pd.concat([resumen, pd.DataFrame([{
-                "Usuario": jugador,
-                "Bono Usado": "No",
-                "Comunidad": "",
-                "Monto Total": 0,
-                "Hora de carga": "",
-                "Veces que usó el bono": 0,
-                "% del Total": "0%"
-            }])], ignore_index=True)
-
-    return df_resultado, resumen
+        detalle = f" · {trabajo.hechas:,} / {trabajo.total:,} {trabajo.unidad}" if trabajo.total else ""
+        st.progress(trabajo.progreso, text=f"⏳ {trabajo.descripcion}{detalle} · {trabajo.segundos:.0f} s")
+    if st.button("✖ Cancel analysis"):
+        # The job itself only stops if no other session is waiting on it
+        trabajo.cancelar()
+        del st.session_state["trabajo"]
+        st.session_state["cancelado"] = trabajo.clave
+        st.rerun()
+
+if analisis is None and error_reporte is None:
+    if "trabajo" in st.session_state:
+        progreso_trabajo()
+    elif "cancelado" in st.session_state:
+        st.info("Analysis cancelled.")
+        if st.button("🔁 Restart analysis"):
+            del st.session_state["cancelado"]
+            st.rerun()
+
+if analisis is not None:
+    df_resultado = analisis["df_resultado"]
+    resumen = analisis["resumen"]
+    agregados = analisis["agregados"]
+
+# --- REFERENCE DATA STATUS ---
+with st.sidebar:
+    st.markdown("---")
+    st.markdown("### 🔄 Reference Data")
+    try:
+        _, _, _, estado = cargar_referencias_cache()
+        origen = {
+            "sheets": "🟢 Refreshed from Google Sheets",
+            "snapshot": "🟢 Local snapshot (sheet unchanged)",
+            "offline": "🟠 Offline – last good snapshot",
+        }[estado["origen"]]
+        antiguedad = datetime.datetime.now(datetime.timezone.utc) - estado["descargado"]
+        st.markdown(origen)
+        st.caption(
+            f"Refresh latency: {estado['latencia'] * 1000:.0f} ms  \n"
+            f"Snapshot age: {int(antiguedad.total_seconds() // 60)} min  \n"
+            f"Sheet revision: {estado['revision']}"
+        )
+        if estado["error"]:
+            st.caption(f"Last error: {estado['error']}")
+    except Exception as e:
+        st.warning(f"Reference data unavailable: {e}")
 
 # --- MAIN CONTENT ---
-tabs = st.tabs(["📊 Dashboard", "📁 Upload Report", "📋 Data Tables", "📈 Charts"])
+# Tabs track which one is open so only that tab's content is built. The
+# Dashboard, Data Tables and Charts sections are fragments: switching their inner
+# tabs reruns just that section. Figures are cached per analysis version.
+@st.cache_resource(max_entries=64, show_spinner=False)
+def figura_cacheada(nombre, version, _agregados):
+    return FIGURAS[nombre](_agregados)
 
-with tabs[0]:
-    st.markdown("## 📊 VIP Activity Dashboard")
+def mostrar_figura(nombre):
+    with etapa(f"figure_{nombre}"):
+        fig = figura_cacheada(nombre, analisis["version"], agregados)
+    st.plotly_chart(fig, use_container_width=True)
+
+@st.fragment
+def seccion_dashboard():
+    # Key Metrics
+    col1, col2, col3, col4 = st.columns(4)
     
-    if 'df_resultado' in locals() and 'resumen' in locals():
-        # Key Metrics
-        col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.markdown("""
+        <div class="metric-card">
+            <div class="metric-value">{}</div>
+            <div class="metric-label">Active VIPs</div>
+        </div>
+        """.format(agregados["metricas"]["activos"]), unsafe_allow_html=True)
         
-        with col1:
-            st.markdown("""
-            <div class="metric-card">
-                <div class="metric-value">{}</div>
-                <div class="metric-label">Active VIPs</div>
-            </div>
-            """.format(len(resumen[resumen['Monto Total'] > 0])), unsafe_allow_html=True)
-            
-        with col2:
-            st.markdown("""
-            <div class="metric-card">
-                <div class="metric-value">${:,.2f}</div>
-                <div class="metric-label">Total Deposits</div>
-            </div>
-            """.format(resumen['Monto Total'].sum()), unsafe_allow_html=True)
-            
-        with col3:
-            st.markdown("""
-            <div class="metric-card">
-                <div class="metric-value">{}</div>
-                <div class="metric-label">Bonus Uses</div>
-            </div>
-            """.format(resumen['Veces que usó el bono'].sum()), unsafe_allow_html=True)
-            
-        with col4:
-            participation_rate = len(resumen[resumen['Monto Total'] > 0]) / len(resumen) * 100 if len(resumen) > 0 else 0
-            st.markdown("""
-            <div class="metric-card">
-                <div class="metric-value">{:.1f}%</div>
-                <div class="metric-label">Participation Rate</div>
-            </div>
-            """.format(participation_rate), unsafe_allow_html=True)
+    with col2:
+        st.markdown("""
+        <div class="metric-card">
+            <div class="metric-value">${:,.2f}</div>
+            <div class="metric-label">Total Deposits</div>
+        </div>
+        """.format(agregados["metricas"]["total"]), unsafe_allow_html=True)
         
-        # Community Distribution
-        st.markdown("### 🏆 Community Distribution")
-        community_data = resumen.groupby('Comunidad').agg({
-            'Monto Total': 'sum',
-            'Usuario': 'nunique'
-        }).reset_index()
+    with col3:
+        st.markdown("""
+        <div class="metric-card">
+            <div class="metric-value">{}</div>
+            <div class="metric-label">Bonus Uses</div>
+        </div>
+        """.format(agregados["metricas"]["usos"]), unsafe_allow_html=True)
         
-        col1, col2 = st.columns(2)
+    with col4:
+        st.markdown("""
+        <div class="metric-card">
+            <div class="metric-value">{:.1f}%</div>
+            <div class="metric-label">Participation Rate</div>
+        </div>
+        """.format(agregados["metricas"]["participacion"]), unsafe_allow_html=True)
+    
+    # Community Distribution
+    st.markdown("### 🏆 Community Distribution")
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        mostrar_figura("depositos_comunidad")
         
-        with col1:
-            fig = px.pie(
-                community_data, 
-                values='Monto Total', 
-                names='Comunidad',
-                title='Deposit Distribution by Community',
-                color_discrete_sequence=px.colors.sequential.Plasma,
-                hole=0.4
-            )
-            fig.update_layout(
-                paper_bgcolor='rgba(0,0,0,0)',
-                plot_bgcolor='rgba(0,0,0,0)',
-                font=dict(color='white'),
-                legend=dict(orientation='h', y=-0.1)
+    with col2:
+        mostrar_figura("vips_comunidad")
+    
+    # Top VIPs
+    st.markdown("### 🌟 Top VIPs by Deposit Amount")
+    mostrar_figura("top_vips")
+
+def volver_a_primera_pagina(nombre):
+    st.session_state[f"{nombre}_pagina"] = 1
+
+def tabla_paginada(nombre, tabla, formatear, column_config, orden_inicial=None, con_horas=False):
+    # Search, filters and sorting run on the server against the table's index; only
+    # the visible page is formatted and sent to the browser
+    reiniciar = dict(on_change=volver_a_primera_pagina, args=(nombre,))
+    col_busqueda, col_comunidad, col_bono = st.columns([2, 1, 2])
+    busqueda = col_busqueda.text_input("Search user", key=f"{nombre}_busqueda", **reiniciar)
+    comunidades = col_comunidad.multiselect("Community", tabla.opciones("Comunidad"), key=f"{nombre}_comunidad", **reiniciar)
+    bonos_elegidos = col_bono.multiselect("Bonus", tabla.opciones("Bono Usado"), key=f"{nombre}_bono", **reiniciar)
+    rangos = {}
+    if con_horas:
+        rangos["Hora"] = st.slider("Hour of day", 0, 23, (0, 23), key=f"{nombre}_horas", **reiniciar)
+
+    columnas = list(column_config)
+    col_orden, col_sentido, col_pagina = st.columns([2, 1, 1])
+    orden = col_orden.selectbox(
+        "Sort by", [None] + columnas,
+        index=columnas.index(orden_inicial) + 1 if orden_inicial else 0,
+        format_func=lambda c: "Report order" if c is None else column_config[c]["label"],
+        key=f"{nombre}_orden", **reiniciar,
+    )
+    descendente = col_sentido.toggle("Descending", value=orden_inicial is not None, key=f"{nombre}_descendente", **reiniciar)
+    pagina = col_pagina.number_input("Page", min_value=1, value=1, step=1, key=f"{nombre}_pagina")
+
+    filas, total = tabla.consultar(
+        busqueda, "Usuario", {"Comunidad": comunidades, "Bono Usado": bonos_elegidos}, rangos,
+        orden, descendente, pagina, TAMANO_PAGINA,
+    )
+    paginas = max(-(-total // TAMANO_PAGINA), 1)
+    st.caption(f"{total:,} rows · page {min(pagina, paginas)} of {paginas:,}")
+    st.dataframe(formatear(filas), use_container_width=True, hide_index=True, column_config=column_config)
+
+@st.fragment
+def seccion_tablas():
+    data_tabs = st.tabs(["Summary", "Detailed Data", "VIP List", "Bonus Offers"], key="pestana_tablas", on_change="rerun")
+    vip_list, bonos = cargar_data()
+    
+    with data_tabs[0]:
+        if data_tabs[0].open:
+            st.markdown("### 📊 Summary of VIP Activity")
+            tabla_paginada(
+                "resumen",
+                analisis.setdefault("tabla_resumen", TablaPaginada(resumen)),
+                formatear_resumen,
+                column_config={
+                    "Usuario": st.column_config.TextColumn("VIP User"),
+                    "Bono Usado": st.column_config.TextColumn("Bonus Used"),
+                    "Comunidad": st.column_config.TextColumn("Community"),
+                    "Monto Total": st.column_config.NumberColumn("Total Amount", format="$%.2f"),
+                    "Hora de carga": st.column_config.TextColumn("Last Deposit Time"),
+                    "Veces que usó el bono": st.column_config.NumberColumn("Times Bonus Used"),
+                    "% del Total": st.column_config.TextColumn("% of Total")
+                },
+                orden_inicial="Monto Total",
             )
-            st.plotly_chart(fig, use_container_width=True)
             
-        with col2:
-            fig = px.bar(
-                community_data,
-                x='Comunidad',
-                y='Usuario',
-                title='Active VIPs by Community',
-                color='Comunidad',
-                color_discrete_sequence=px.colors.sequential.Plasma
-            )
-            fig.update_layout(
-                paper_bgcolor='rgba(0,0,0,0)',
-                plot_bgcolor='rgba(0,0,0,0)',
-                font=dict(color='white'),
-                xaxis=dict(title='Community'),
-                yaxis=dict(title='Number of VIPs')
+    with data_tabs[1]:
+        if data_tabs[1].open:
+            st.markdown("### 📝 Detailed Activity Data")
+            tabla_paginada(
+                "resultado",
+                analisis.setdefault("tabla_resultado", TablaPaginada(df_resultado)),
+                formatear_resultado,
+                column_config={
+                    "Fecha": st.column_config.TextColumn("Date"),
+                    "Usuario": st.column_config.TextColumn("User"),
+                    "Comunidad": st.column_config.TextColumn("Community"),
+                    "Monto": st.column_config.NumberColumn("Amount", format="$%.2f"),
+                    "Hora de carga": st.column_config.TextColumn("Deposit Time"),
+                    "Bono Usado": st.column_config.TextColumn("Bonus Used"),
+                    "Participó": st.column_config.TextColumn("Participated")
+                },
+                con_horas=True,
             )
-            st.plotly_chart(fig, use_container_width=True)
+            
+    with data_tabs[2]:
+        if data_tabs[2].open:
+            st.markdown("### 👥 VIP List")
+            st.dataframe(vip_list, use_container_width=True)
+            
+    with data_tabs[3]:
+        if data_tabs[3].open:
+            st.markdown("### 🎁 Bonus Offers")
+            st.dataframe(bonos, use_container_width=True)
+
+@st.fragment
+def seccion_graficos():
+    chart_tabs = st.tabs(["Bonus Usage", "Hourly Activity", "Community Comparison"], key="pestana_graficos", on_change="rerun")
+    
+    with chart_tabs[0]:
+        if chart_tabs[0].open:
+            st.markdown("### 🎁 Bonus Usage Analysis")
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                mostrar_figura("monto_bonos")
+                
+            with col2:
+                mostrar_figura("usos_bonos")
         
-        # Top VIPs
-        st.markdown("### 🌟 Top VIPs by Deposit Amount")
-        top_vips = resumen.sort_values('Monto Total', ascending=False).head(10)
+    with chart_tabs[1]:
+        if chart_tabs[1].open:
+            st.markdown("### ⏰ Hourly Activity Analysis")
+            mostrar_figura("horaria")
         
-        fig = px.bar(
-            top_vips,
-            x='Usuario',
-            y='Monto Total',
-            color='Comunidad',
-            title='Top 10 VIPs by Deposit Amount',
-            color_discrete_sequence=px.colors.sequential.Plasma
+    with chart_tabs[2]:
+        if chart_tabs[2].open:
+            st.markdown("### 🏆 Community Comparison")
+            mostrar_figura("radar")
+            
+            # Community metrics table
+            st.markdown("### 📊 Community Metrics")
+            st.dataframe(
+                agregados["comunidades"],
+                use_container_width=True,
+                column_config={
+                    "Comunidad": st.column_config.TextColumn("Community"),
+                    "Total Deposit": st.column_config.NumberColumn("Total Deposit", format="$%.2f"),
+                    "Average Deposit": st.column_config.NumberColumn("Avg Deposit", format="$%.2f"),
+                    "Median Deposit": st.column_config.NumberColumn("Median Deposit", format="$%.2f"),
+                    "Transaction Count": st.column_config.NumberColumn("# Transactions"),
+                    "Unique VIPs": st.column_config.NumberColumn("# Unique VIPs")
+                }
+            )
+
+@st.fragment
+def seccion_historial(rango):
+    col_vista, col_fechas = st.columns([1, 2])
+    vista = col_vista.radio("View", ["VIP", "Community"], horizontal=True, key="historial_vista")
+    hasta = rango[1]
+    desde = max(rango[0], hasta - datetime.timedelta(days=89))
+    fechas = col_fechas.date_input(
+        "Days", value=(desde, hasta), min_value=rango[0], max_value=rango[1], key="historial_fechas"
+    )
+    if len(fechas) != 2:
+        return
+    desde, hasta = fechas
+
+    if vista == "VIP":
+        usuario = st.text_input("VIP user", key="historial_usuario").strip()
+        if not usuario:
+            st.info("Enter a VIP user to see their activity over the selected days.")
+            return
+        tendencia = tendencia_vip(usuario, desde, hasta)
+        if not tendencia["usos"].any():
+            st.warning(f"No bonus activity stored for {usuario} between {desde} and {hasta}.")
+            return
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Total Deposits", f"${tendencia['monto'].sum():,.2f}")
+        col2.metric("Bonus Uses", f"{int(tendencia['usos'].sum()):,}")
+        col3.metric("Active Days", f"{int((tendencia['usos'] > 0).sum())} / {len(tendencia)}")
+        st.plotly_chart(
+            figura_tendencia(tendencia, f"Daily Activity of {usuario}", "usos", "Bonus Uses"),
+            use_container_width=True
         )
-        fig.update_layout(
-            paper_bgcolor='rgba(0,0,0,0)',
-            plot_bgcolor='rgba(0,0,0,0)',
-            font=dict(color='white'),
-            xaxis=dict(title='VIP User'),
-            yaxis=dict(title='Total Deposit Amount')
+        st.markdown("### 🎁 Bonuses Used")
+        st.dataframe(
+            bonos_vip(usuario, desde, hasta),
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "bono": st.column_config.TextColumn("Bonus"),
+                "usos": st.column_config.NumberColumn("Times Used"),
+                "monto": st.column_config.NumberColumn("Deposits", format="$%.2f"),
+                "dias": st.column_config.NumberColumn("Days"),
+            }
         )
-        st.plotly_chart(fig, use_container_width=True)
     else:
+        comunidades = comunidades_historial()
+        if not comunidades:
+            st.info("No community activity stored yet.")
+            return
+        comunidad = st.selectbox("Community", comunidades, key="historial_comunidad")
+        tendencia = tendencia_comunidad(comunidad, desde, hasta)
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Total Deposits", f"${tendencia['monto'].sum():,.2f}")
+        col2.metric("Bonus Uses", f"{int(tendencia['usos'].sum()):,}")
+        col3.metric("Peak Active VIPs", f"{int(tendencia['vips'].max()) if len(tendencia) else 0:,}")
+        st.plotly_chart(
+            figura_tendencia(tendencia, f"Daily Activity of {comunidad}", "vips", "Active VIPs"),
+            use_container_width=True
+        )
+
+tabs = st.tabs(["📊 Dashboard", "📁 Upload Report", "📋 Data Tables", "📈 Charts", "🗂️ History"], key="pestana", on_change="rerun")
+
+with tabs[0]:
+    st.markdown("## 📊 VIP Activity Dashboard")
+    
+    if analisis is None:
         st.markdown("""
         <div class="warning-card">
             <h3>📊 Welcome to the VIP Analysis Dashboard!</h3>
             <p>Please upload a report file in the "Upload Report" tab to see the dashboard.</p>
         </div>
         """, unsafe_allow_html=True)
+    elif tabs[0].open:
+        seccion_dashboard()
 
 with tabs[1]:
     st.markdown("## 📁 Upload Casino Report")
@@ -409,31 +791,74 @@ with tabs[1]:
         </div>
         """, unsafe_allow_html=True)
         
-        archivo = st.file_uploader("", type=["csv", "xlsx"])
+        st.file_uploader("", type=["csv", "xlsx"], key="archivo_reporte")
         
-        if archivo:
-            try:
-                with st.spinner("Processing report..."):
-                    df_reporte = pd.read_excel(archivo) if archivo.name.endswith(".xlsx") else pd.read_csv(archivo)
-                    vip_list, bonos = cargar_data()
-                    df_resultado, resumen = analizar_participacion(df_reporte, vip_list, bonos)
-                
-                st.markdown("""
-                <div class="success-card">
-                    <h3>✅ Analysis Complete!</h3>
-                    <p>Your report has been processed successfully. View the results in the Dashboard, Data Tables, and Charts tabs.</p>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                # Save results button
-                st.download_button(
-                    label="📥 Download Results as CSV",
-                    data=resumen.to_csv(index=False),
-                    file_name=f"vip_activity_report_{datetime.date.today().strftime('%Y-%m-%d')}.csv",
-                    mime="text/csv"
+        dias = dias_guardados()
+        if dias:
+            with st.expander("📦 Re-analyze stored reports"):
+                st.date_input(
+                    "Stored days",
+                    value=(dias[-1], dias[-1]),
+                    min_value=dias[0],
+                    max_value=dias[-1],
+                    key="rango_almacen_input"
                 )
-            except Exception as e:
-                st.error(f"Error processing the file: {e}")
+                st.button("🔁 Re-analyze", on_click=seleccionar_almacen)
+        
+        if error_reporte is not None:
+            st.error(f"Error processing the file: {error_reporte}")
+        elif analisis is not None:
+            st.markdown("""
+            <div class="success-card">
+                <h3>✅ Analysis Complete!</h3>
+                <p>Your report has been processed successfully. View the results in the Dashboard, Data Tables, and Charts tabs.</p>
+            </div>
+            """, unsafe_allow_html=True)
+            if analisis["filas_nuevas"] < analisis["filas"]:
+                st.caption(
+                    f"Incremental update: {analisis['filas_nuevas']:,} new rows were matched; the other "
+                    f"{analisis['filas'] - analisis['filas_nuevas']:,} were already analyzed in an earlier export."
+                )
+            
+            # Files are only built when a download is clicked (on Streamlit's download
+            # thread, not this rerun) and then kept for this result version
+            st.markdown("#### 📥 Download Results")
+            col_tabla, col_formato = st.columns(2)
+            tabla_exporte = col_tabla.radio("Table", ["Summary", "Detailed Data"], horizontal=True, key="exporte_tabla")
+            formato = col_formato.radio(
+                "Format", list(FORMATOS), format_func=lambda f: FORMATOS[f][0], horizontal=True, key="exporte_formato"
+            )
+            if tabla_exporte == "Summary":
+                datos, formatear, nombre = resumen, formatear_resumen, "vip_activity_report"
+            else:
+                datos, formatear, nombre = df_resultado, formatear_resultado, "vip_deposits"
+
+            def generar_exporte(datos=datos, formatear=formatear, formato=formato, version=analisis["version"], nombre=nombre):
+                with open(exportar(datos, formatear, formato, version, nombre), "rb") as f:
+                    return f.read()
+
+            st.download_button(
+                label=f"📥 Download {tabla_exporte} as {FORMATOS[formato][0]}",
+                data=generar_exporte,
+                file_name=f"{nombre}_{datetime.date.today().strftime('%Y-%m-%d')}.{formato}",
+                mime=FORMATOS[formato][1],
+                on_click="ignore"
+            )
+            
+            # Push the daily results to actividad_diaria_vip. Each exported day replaces
+            # that day's rows in the sheet, so (as with the history) a community-filtered
+            # result, which only covers part of each day, is not written
+            parcial = analisis["clave"][2] is not None
+            if not connection_error and parcial:
+                st.caption("Clear the community filter to save to the Activity Sheet: saving replaces every row of the exported days.")
+            if not connection_error and st.button("📤 Save to Activity Sheet", disabled=parcial):
+                try:
+                    with st.spinner("Writing results to actividad_diaria_vip..."):
+                        vip_list, _ = cargar_data()
+                        escritas = exportar_actividad(hoja_actividad, resumen_diario(df_resultado, vip_list))
+                    st.success(f"{escritas} rows written to actividad_diaria_vip.")
+                except Exception as e:
+                    st.error(f"Error writing to Google Sheets: {e}")
     
     with upload_col2:
         st.markdown("""
@@ -454,227 +879,53 @@ with tabs[1]:
 with tabs[2]:
     st.markdown("## 📋 Data Tables")
     
-    if 'df_resultado' in locals() and 'resumen' in locals():
-        data_tabs = st.tabs(["Summary", "Detailed Data", "VIP List", "Bonus Offers"])
-        
-        with data_tabs[0]:
-            st.markdown("### 📊 Summary of VIP Activity")
-            st.dataframe(
-                resumen.sort_values('Monto Total', ascending=False),
-                use_container_width=True,
-                column_config={
-                    "Usuario": st.column_config.TextColumn("VIP User"),
-                    "Bono Usado": st.column_config.TextColumn("Bonus Used"),
-                    "Comunidad": st.column_config.TextColumn("Community"),
-                    "Monto Total": st.column_config.NumberColumn("Total Amount", format="$%.2f"),
-                    "Hora de carga": st.column_config.TextColumn("Last Deposit Time"),
-                    "Veces que usó el bono": st.column_config.NumberColumn("Times Bonus Used"),
-                    "% del Total": st.column_config.TextColumn("% of Total")
-                }
-            )
-            
-        with data_tabs[1]:
-            st.markdown("### 📝 Detailed Activity Data")
-            st.dataframe(
-                df_resultado,
-                use_container_width=True,
-                column_config={
-                    "Fecha": st.column_config.TextColumn("Date"),
-                    "Usuario": st.column_config.TextColumn("User"),
-                    "Comunidad": st.column_config.TextColumn("Community"),
-                    "Monto": st.column_config.NumberColumn("Amount", format="$%.2f"),
-                    "Hora de carga": st.column_config.TextColumn("Deposit Time"),
-                    "Bono Usado": st.column_config.TextColumn("Bonus Used"),
-                    "Participó": st.column_config.TextColumn("Participated")
-                }
-            )
-            
-        with data_tabs[2]:
-            st.markdown("### 👥 VIP List")
-            vip_list, _ = cargar_data()
-            st.dataframe(vip_list, use_container_width=True)
-            
-        with data_tabs[3]:
-            st.markdown("### 🎁 Bonus Offers")
-            _, bonos = cargar_data()
-            st.dataframe(bonos, use_container_width=True)
-    else:
+    if analisis is None:
         st.info("Please upload a report file to view data tables.")
+    elif tabs[2].open:
+        seccion_tablas()
 
 with tabs[3]:
     st.markdown("## 📈 Charts and Visualizations")
     
-    if 'df_resultado' in locals() and 'resumen' in locals():
-        chart_tabs = st.tabs(["Bonus Usage", "Hourly Activity", "Community Comparison"])
-        
-        with chart_tabs[0]:
-            st.markdown("### 🎁 Bonus Usage Analysis")
-            
-            # Prepare data
-            bonus_data = resumen[resumen['Bono Usado'] != 'No'].copy()
-            bonus_counts = bonus_data.groupby('Bono Usado').agg({
-                'Monto Total': 'sum',
-                'Usuario': 'nunique',
-                'Veces que usó el bono': 'sum'
-            }).reset_index()
-            
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                fig = px.pie(
-                    bonus_counts, 
-                    values='Monto Total', 
-                    names='Bono Usado',
-                    title='Deposit Amount by Bonus Type',
-                    color_discrete_sequence=px.colors.sequential.Plasma
-                )
-                fig.update_layout(
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    font=dict(color='white')
-                )
-                st.plotly_chart(fig, use_container_width=True)
-                
-            with col2:
-                fig = px.bar(
-                    bonus_counts,
-                    x='Bono Usado',
-                    y='Veces que usó el bono',
-                    title='Number of Times Each Bonus Was Used',
-                    color='Bono Usado',
-                    color_discrete_sequence=px.colors.sequential.Plasma
-                )
-                fig.update_layout(
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    font=dict(color='white'),
-                    xaxis=dict(title='Bonus Type'),
-                    yaxis=dict(title='Usage Count')
-                )
-                st.plotly_chart(fig, use_container_width=True)
-            
-        with chart_tabs[1]:
-            st.markdown("### ⏰ Hourly Activity Analysis")
-            
-            # Prepare hourly data
-            df_resultado['Hour'] = pd.to_datetime(df_resultado['Hora de carga']).dt.hour
-            hourly_data = df_resultado.groupby('Hour').agg({
-                'Monto': 'sum',
-                'Usuario': 'nunique'
-            }).reset_index()
-            
-            # Fill missing hours
-            all_hours = pd.DataFrame({'Hour': range(0, 24)})
-            hourly_data = pd.merge(all_hours, hourly_data, on='Hour', how='left').fillna(0)
-            
-            fig = go.Figure()
-            
-            fig.add_trace(go.Scatter(
-                x=hourly_data['Hour'],
-                y=hourly_data['Monto'],
-                mode='lines+markers',
-                name='Deposit Amount',
-                line=dict(color='#FFD700', width=3),
-                marker=dict(size=8, color='#FFD700')
-            ))
-            
-            fig.add_trace(go.Bar(
-                x=hourly_data['Hour'],
-                y=hourly_data['Usuario'],
-                name='Active VIPs',
-                marker_color='rgba(75, 192, 192, 0.7)'
-            ))
-            
-            fig.update_layout(
-                title='Hourly Activity Distribution',
-                xaxis=dict(
-                    title='Hour of Day',
-                    tickmode='linear',
-                    tick0=0,
-                    dtick=1
-                ),
-                yaxis=dict(title='Deposit Amount'),
-                yaxis2=dict(
-                    title='Number of VIPs',
-                    overlaying='y',
-                    side='right'
-                ),
-                legend=dict(x=0.01, y=0.99),
-                hovermode='x unified',
-                paper_bgcolor='rgba(0,0,0,0)',
-                plot_bgcolor='rgba(0,0,0,0)',
-                font=dict(color='white')
-            )
-            
-            st.plotly_chart(fig, use_container_width=True)
-            
-        with chart_tabs[2]:
-            st.markdown("### 🏆 Community Comparison")
-            
-            # Prepare community data
-            community_metrics = df_resultado.groupby('Comunidad').agg({
-                'Monto': ['sum', 'mean', 'median', 'count'],
-                'Usuario': 'nunique'
-            }).reset_index()
-            
-            community_metrics.columns = ['Comunidad', 'Total Deposit', 'Average Deposit', 'Median Deposit', 'Transaction Count', 'Unique VIPs']
-            
-            # Filter out empty community
-            community_metrics = community_metrics[community_metrics['Comunidad'] != '']
-            
-            # Create radar chart
-            categories = ['Total Deposit', 'Average Deposit', 'Median Deposit', 'Transaction Count', 'Unique VIPs']
-            
-            fig = go.Figure()
-            
-            for i, community in enumerate(community_metrics['Comunidad']):
-                # Normalize values for radar chart
-                values = []
-                for cat in categories:
-                    max_val = community_metrics[cat].max()
-                    val = community_metrics.loc[community_metrics['Comunidad'] == community, cat].values[0]
-                    values.append(val / max_val if max_val > 0 else 0)
-                
-                # Add trace
-                fig.add_trace(go.Scatterpolar(
-                    r=values,
-                    theta=categories,
-                    fill='toself',
-                    name=community,
-                    line_color=px.colors.sequential.Plasma[i*3]
-                ))
-            
-            fig.update_layout(
-                polar=dict(
-                    radialaxis=dict(
-                        visible=True,
-                        range=[0, 1]
-                    )
-                ),
-                title='Community Performance Comparison',
-                paper_bgcolor='rgba(0,0,0,0)',
-                plot_bgcolor='rgba(0,0,0,0)',
-                font=dict(color='white')
-            )
-            
-            st.plotly_chart(fig, use_container_width=True)
-            
-            # Community metrics table
-            st.markdown("### 📊 Community Metrics")
+    if analisis is None:
+        st.info("Please upload a report file to view charts and visualizations.")
+    elif tabs[3].open:
+        seccion_graficos()
+
+with tabs[4]:
+    st.markdown("## 🗂️ Activity History")
+    
+    # Read straight from the local history; no report has to be loaded
+    if tabs[4].open:
+        rango = rango_historial()
+        if rango is None:
+            st.info("No history yet. Every analyzed report is added to it automatically.")
+        else:
+            st.caption(f"Stored days: {rango[0]} to {rango[1]}")
+            seccion_historial(rango)
+
+# --- DIAGNOSTICS ---
+if corrida is not None:
+    terminar_corrida()
+    with st.expander("🩺 Diagnostics – stages of this run"):
+        if corrida.etapas:
             st.dataframe(
-                community_metrics,
+                pd.DataFrame(corrida.tabla()),
                 use_container_width=True,
                 column_config={
-                    "Comunidad": st.column_config.TextColumn("Community"),
-                    "Total Deposit": st.column_config.NumberColumn("Total Deposit", format="$%.2f"),
-                    "Average Deposit": st.column_config.NumberColumn("Avg Deposit", format="$%.2f"),
-                    "Median Deposit": st.column_config.NumberColumn("Median Deposit", format="$%.2f"),
-                    "Transaction Count": st.column_config.NumberColumn("# Transactions"),
-                    "Unique VIPs": st.column_config.NumberColumn("# Unique VIPs")
+                    "stage": st.column_config.TextColumn("Stage"),
+                    "seconds": st.column_config.NumberColumn("Wall time (s)", format="%.3f"),
+                    "rows": st.column_config.NumberColumn("Rows"),
+                    "peak_mb": st.column_config.NumberColumn("Peak memory (MB)", format="%.1f"),
                 }
             )
-    else:
-        st.info("Please upload a report file to view charts and visualizations.")
+        else:
+            st.caption("Nothing was recomputed on this rerun; every stage was served from cache.")
+        uso = cache_compartida.estadisticas()
+        st.caption(
+            f"Shared cache: {uso['entries']} entries, {uso['used_mb']:,.1f} / {uso['budget_mb']:,.0f} MB · "
+            f"{uso['hits']} hits, {uso['misses']} misses, {uso['evictions']} evictions"
+        )
 
 # --- FOOTER ---
 st.markdown("---")
@@ -0,0 +1,223 @@
+"""Headless analysis of many casino reports, one worker process per report.
+
+    python batch.py data/entrantes/ "marzo/*.xlsx" --output resultados/ --workers 8
+
+For every report day, ``<output>/<YYYY-MM-DD>/`` gets ``resultado_<report>.csv``
+(per-deposit detail) and ``resumen_<report>.csv``; ``<output>/resumen.csv`` stacks
+the daily summaries of every report, and the days are added to the local activity
+history (``--no-history`` skips that). VIP and bonus data come from Google Sheets
+when ``--credentials`` is given and from the local snapshot otherwise.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from analysis import (
+    COLUMNAS_RESUMEN,
+    agregar_participacion,
+    analizar_participacion,
+    compilar_bonos,
+    compilar_comunidades,
+    formatear_resultado,
+    formatear_resumen,
+    resumen_diario,
+    resumen_por_dia,
+)
+from diagnostics import etapa, iniciar_corrida, terminar_corrida
+from history import ARCHIVO_HISTORIAL, guardar_historial
+from ingestion import analizar_csv_por_bloques, aviso_conversion, leer_reporte, sumar_fallos
+from sheets import DIRECTORIO_SNAPSHOTS, NOMBRE_LIBRO, cargar_referencias
+
+EXTENSIONES = (".csv", ".xlsx")
+
+# Reference data of each worker process, set once by _inicializar_worker so it is
+# pickled per worker instead of per report
+_referencias = {}
+
+
+def descubrir_reportes(entradas):
+    """Expand directories and glob patterns into a sorted list of report files."""
+    rutas = set()
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            candidatos = [os.path.join(entrada, nombre) for nombre in os.listdir(entrada)]
+        else:
+            candidatos = glob.glob(entrada)
+        rutas.update(
+            os.path.abspath(c) for c in candidatos
+            if os.path.isfile(c) and c.lower().endswith(EXTENSIONES)
+        )
+    return sorted(rutas)
+
+
+def _inicializar_worker(vip_list, bonos, reglas, diagnostico=False, reglas_comunidad=None):
+    _referencias.update(vip_list=vip_list, bonos=bonos, reglas=reglas, diagnostico=diagnostico,
+                        reglas_comunidad=reglas_comunidad or compilar_comunidades())
+
+
+def _carpeta_dia(salida, dia):
+    carpeta = os.path.join(salida, dia.strftime("%Y-%m-%d"))
+    os.makedirs(carpeta, exist_ok=True)
+    return carpeta
+
+
+def _analizar_csv(ruta, salida, nombre):
+    # CSV reports are streamed: each chunk's deposits are appended to their day's
+    # resultado file as soon as they are matched and only per-day partial aggregates
+    # are kept, so a multi-GB export runs in bounded memory
+    parciales, fallos, escritos = {}, {}, set()
+    filas = 0
+
+    def _al_bloque(bloque, df_bloque):
+        nonlocal filas
+        filas += len(bloque)
+        sumar_fallos(fallos, bloque)
+        for dia, del_dia in df_bloque.groupby("Fecha", sort=True):
+            destino = os.path.join(_carpeta_dia(salida, dia), f"resultado_{nombre}.csv")
+            formatear_resultado(del_dia).to_csv(
+                destino, mode="a" if destino in escritos else "w", header=destino not in escritos, index=False
+            )
+            escritos.add(destino)
+            parciales.setdefault(dia, []).append(agregar_participacion(del_dia))
+
+    analizar_csv_por_bloques(
+        ruta, _referencias["vip_list"], _referencias["bonos"], _referencias["reglas"],
+        reglas_comunidad=_referencias["reglas_comunidad"], al_bloque=_al_bloque,
+    )
+    return resumen_por_dia(parciales, _referencias["vip_list"]), filas, fallos
+
+
+def _analizar_xlsx(ruta, salida, nombre):
+    vip_list = _referencias["vip_list"]
+    with etapa("read_report") as medicion:
+        df_reporte = leer_reporte(ruta)
+        medicion["filas"] = len(df_reporte)
+    df_resultado, _ = analizar_participacion(
+        df_reporte, vip_list, _referencias["bonos"], _referencias["reglas"], _referencias["reglas_comunidad"]
+    )
+    for dia, del_dia in df_resultado.groupby("Fecha", sort=True):
+        formatear_resultado(del_dia).to_csv(os.path.join(_carpeta_dia(salida, dia), f"resultado_{nombre}.csv"), index=False)
+    return resumen_diario(df_resultado, vip_list), len(df_reporte), df_reporte.attrs.get("fallos_conversion")
+
+
+def procesar_archivo(ruta, salida):
+    """Analyze one report and write its per-day outputs; returns the daily resumen."""
+    inicio = time.perf_counter()
+    iniciar_corrida(_referencias.get("diagnostico", False))
+    nombre = os.path.splitext(os.path.basename(ruta))[0]
+    analizar = _analizar_csv if ruta.lower().endswith(".csv") else _analizar_xlsx
+    diario, filas, fallos = analizar(ruta, salida, nombre)
+    aviso = aviso_conversion(fallos)
+    if aviso is not None:
+        print(f"WARNING {ruta}: {aviso}", file=sys.stderr)
+
+    for dia, del_dia in diario.groupby("Fecha", sort=True):
+        resumen = formatear_resumen(del_dia.drop(columns="Fecha"))
+        resumen.to_csv(os.path.join(_carpeta_dia(salida, dia), f"resumen_{nombre}.csv"), index=False)
+
+    terminar_corrida()
+    diario.insert(0, "Reporte", os.path.basename(ruta))
+    return diario, filas, time.perf_counter() - inicio
+
+
+def cargar_datos_referencia(credenciales=None, directorio_snapshots=DIRECTORIO_SNAPSHOTS):
+    sh = None
+    if credenciales:
+        import gspread
+        sh = gspread.service_account(filename=credenciales).open(NOMBRE_LIBRO)
+    return cargar_referencias(sh, directorio_snapshots)
+
+
+def _ultimo_por_dia(exportes):
+    # A day covered by several reports is taken from the newest export only (the
+    # rule storage.py applies to uploads), not summed across exports
+    vigentes = {}
+    # exportes: (mtime, path, daily resumen) of every report; newer ones overwrite
+    for _, _, diario in sorted(exportes, key=lambda e: e[:2]):
+        for dia in diario["Fecha"].unique():
+            vigentes[dia] = diario
+    if not vigentes:
+        # Only reports without a dated row (e.g. header-only): nothing to store
+        return pd.DataFrame(columns=["Fecha"] + COLUMNAS_RESUMEN)
+    return pd.concat(
+        [diario[diario["Fecha"] == dia] for dia, diario in vigentes.items()], ignore_index=True
+    ).drop(columns="Reporte")
+
+
+def procesar_lote(rutas, salida, vip_list, bonos, workers=None, diagnostico=False, comunidades=None,
+                  historial=None):
+    """Fan ``rutas`` out over a process pool; returns (combined resumen, failures).
+
+    ``comunidades`` is the comunidades sheet (None or empty for the default communities).
+    When ``historial`` is a path, the daily summaries are stored there (see ``history``);
+    a day found in several reports is stored from the most recently modified one.
+    """
+    reglas = compilar_bonos(bonos)
+    os.makedirs(salida, exist_ok=True)
+    resumenes, fallidos, exportes = [], [], []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_inicializar_worker,
+                             initargs=(vip_list, bonos, reglas, diagnostico, compilar_comunidades(comunidades))) as pool:
+        tareas = {pool.submit(procesar_archivo, ruta, salida): ruta for ruta in rutas}
+        for tarea in as_completed(tareas):
+            ruta = tareas[tarea]
+            try:
+                diario, filas, segundos = tarea.result()
+            except Exception as e:
+                fallidos.append((ruta, e))
+                print(f"FAILED  {ruta}: {e}", file=sys.stderr)
+                continue
+            resumenes.append(diario)
+            exportes.append((os.path.getmtime(ruta), ruta, diario))
+            print(f"{filas:>9} rows {segundos:7.2f} s  {ruta}")
+
+    if resumenes:
+        # Reports finish in any order; sort by report, then day, for a stable output
+        combinado = pd.concat(resumenes, ignore_index=True).sort_values(["Fecha", "Reporte"], kind="stable")
+        if historial:
+            # Written once from this process: SQLite takes a single writer at a time
+            guardar_historial(_ultimo_por_dia(exportes), historial)
+        combinado = formatear_resumen(combinado.reset_index(drop=True))
+    else:
+        combinado = pd.DataFrame(columns=["Reporte", "Fecha"] + COLUMNAS_RESUMEN)
+    combinado.to_csv(os.path.join(salida, "resumen.csv"), index=False)
+    return combinado, fallidos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("reports", nargs="+", help="report files, directories or glob patterns")
+    parser.add_argument("--output", default="resultados", help="directory the outputs are written to")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--credentials", help="service account JSON used to read vip_list/bonos_ofrecidos")
+    parser.add_argument("--snapshot-dir", default=DIRECTORIO_SNAPSHOTS,
+                        help="local snapshot of the reference sheets")
+    parser.add_argument("--no-history", action="store_true",
+                        help=f"don't add the analyzed days to the local history ({ARCHIVO_HISTORIAL})")
+    parser.add_argument("--diagnostics", action="store_true",
+                        help="log per-stage timings and peak memory as JSON lines")
+    args = parser.parse_args()
+
+    rutas = descubrir_reportes(args.reports)
+    if not rutas:
+        parser.error("no .csv or .xlsx reports found")
+    vip_list, bonos, comunidades, estado = cargar_datos_referencia(args.credentials, args.snapshot_dir)
+    if args.credentials and estado["error"]:
+        print(f"Using offline snapshot ({estado['error']})", file=sys.stderr)
+
+    inicio = time.perf_counter()
+    combinado, fallidos = procesar_lote(
+        rutas, args.output, vip_list, bonos, args.workers, args.diagnostics, comunidades,
+        None if args.no_history else ARCHIVO_HISTORIAL,
+    )
+    print(f"{len(rutas) - len(fallidos)}/{len(rutas)} reports, {len(combinado)} summary rows "
+          f"in {time.perf_counter() - inicio:.1f} s -> {os.path.join(args.output, 'resumen.csv')}")
+    return 1 if fallidos else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""Per-stage timings of the analysis pipeline on synthetic data, written as JSON.
+
+    python benchmarks/bench_suite.py --rows 10000 1000000 --bonuses 1 500 --vips 1000 100000
+    python benchmarks/bench_suite.py --baseline bench_anterior.json
+
+Stages: ingestion (leer_csv on a generated CSV), matching (clasificar_depositos),
+summary (agregar_participacion + completar_resumen), analysis (the whole
+analizar_participacion), rollups (charts.calcular_agregados) and figures
+(charts.construir_figuras).
+"""
+import argparse
+import datetime
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from analysis import (
+    agregar_participacion,
+    analizar_participacion,
+    clasificar_depositos,
+    compilar_bonos,
+    completar_resumen,
+)
+from charts import calcular_agregados, construir_figuras
+from ingestion import leer_csv
+from sintetico import generar_bonos, generar_reporte, generar_vips
+
+
+def medir(funcion, repeticiones):
+    """Best and mean wall time of ``funcion()``, plus its last return value."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos), sum(tiempos) / len(tiempos), resultado
+
+
+def medir_etapa(funcion, repeticiones):
+    mejor, media, resultado = medir(funcion, repeticiones)
+    return {"best_s": mejor, "mean_s": media}, resultado
+
+
+def version_codigo():
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def correr_caso(filas, bonos_por_dia, vips, dias, repeticiones, directorio):
+    vip_list = generar_vips(vips)
+    bonos = generar_bonos(bonos_por_dia, dias)
+    ruta = os.path.join(directorio, f"reporte_{filas}.csv")
+    generar_reporte(filas, vip_list, dias).to_csv(ruta, index=False)
+    reglas = compilar_bonos(bonos)
+
+    etapas = {}
+    etapas["ingestion"], df_reporte = medir_etapa(lambda: leer_csv(ruta), repeticiones)
+    etapas["matching"], df_resultado = medir_etapa(lambda: clasificar_depositos(df_reporte, reglas), repeticiones)
+    etapas["summary"], resumen = medir_etapa(
+        lambda: completar_resumen(agregar_participacion(df_resultado), vip_list), repeticiones
+    )
+    etapas["analysis"], _ = medir_etapa(lambda: analizar_participacion(df_reporte, vip_list, bonos), repeticiones)
+    etapas["rollups"], agregados = medir_etapa(lambda: calcular_agregados(resumen, df_resultado), repeticiones)
+    etapas["figures"], _ = medir_etapa(lambda: construir_figuras(agregados), repeticiones)
+    os.remove(ruta)
+
+    caso = {"rows": filas, "bonuses_per_day": bonos_por_dia, "vips": vips, "days": dias}
+    return [dict(caso, stage=etapa, **tiempos) for etapa, tiempos in etapas.items()]
+
+
+def _clave(resultado):
+    return (resultado["rows"], resultado["bonuses_per_day"], resultado["vips"], resultado["days"], resultado["stage"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--bonuses", type=int, nargs="+", default=[10], help="bonuses per day")
+    parser.add_argument("--vips", type=int, nargs="+", default=[1_000])
+    parser.add_argument("--days", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="bench_suite.json", help="where the JSON results are written")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    base = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            base = {_clave(r): r for r in json.load(f)["results"]}
+
+    resultados = []
+    print(f"{'rows':>10} {'bonos':>6} {'VIPs':>7} {'stage':<10} {'best':>9} {'rows/s':>12} {'vs base':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for filas, bonos_por_dia, vips in itertools.product(args.rows, args.bonuses, args.vips):
+            for r in correr_caso(filas, bonos_por_dia, vips, args.days, args.repeat, tmp):
+                anterior = base.get(_clave(r))
+                relacion = f"{r['best_s'] / anterior['best_s']:7.2f}x" if anterior else ""
+                print(f"{filas:>10} {bonos_por_dia:>6} {vips:>7} {r['stage']:<10} "
+                      f"{r['best_s']:8.3f}s {filas / r['best_s']:12,.0f} {relacion:>8}")
+                resultados.append(r)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({
+            "version": version_codigo(),
+            "date": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "repeat": args.repeat,
+            "results": resultados,
+        }, f, indent=2)
+    print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
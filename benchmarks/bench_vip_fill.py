@@ -0,0 +1,76 @@
+"""Non-participant fill of completar_resumen vs the old per-VIP pd.concat loop.
+
+    python benchmarks/bench_vip_fill.py --sizes 1000 10000 100000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from analysis import completar_resumen
+
+
+def relleno_anterior(resumen, vip_list):
+    # The loop completar_resumen used to run, kept here as the baseline
+    usuarios_con_datos = resumen['Usuario'].astype(str).unique() if not resumen.empty else []
+    for jugador in vip_list['usuario']:
+        if str(jugador) not in usuarios_con_datos:
+            resumen = pd.concat([resumen, pd.DataFrame([{
+                "Usuario": jugador,
+                "Bono Usado": "No",
+                "Comunidad": "",
+                "Monto Total": 0,
+                "Hora de carga": "",
+                "Veces que usó el bono": 0,
+                "% del Total": "0%"
+            }])], ignore_index=True)
+    return resumen
+
+
+def generar(vips, participacion=0.3, semilla=0):
+    rnd = np.random.default_rng(semilla)
+    vip_list = pd.DataFrame({"usuario": [f"vip{i}" for i in range(vips)]})
+    activos = vip_list["usuario"].sample(frac=participacion, random_state=semilla).to_numpy()
+    resumen = pd.DataFrame({
+        "Usuario": activos,
+        "Bono Usado": "20% (Fenix)",
+        "Comunidad": "Fenix",
+        "Monto Total": rnd.integers(100, 20000, len(activos)).astype(float),
+        "Hora de carga": pd.Timedelta(hours=12),
+        "Veces que usó el bono": rnd.integers(1, 5, len(activos)),
+        "% del Total": 0.0,
+    })
+    return resumen, vip_list
+
+
+def medir(funcion, *args):
+    inicio = time.perf_counter()
+    funcion(*args)
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--old-max", type=int, default=10_000,
+                        help="largest VIP list the quadratic baseline is run on")
+    args = parser.parse_args()
+
+    print(f"{'VIPs':>8} {'old loop':>10} {'anti-join':>10} {'speedup':>8}")
+    for vips in args.sizes:
+        resumen, vip_list = generar(vips)
+        nuevo = medir(completar_resumen, resumen.copy(), vip_list)
+        if vips <= args.old_max:
+            anterior = medir(relleno_anterior, resumen.copy(), vip_list)
+            print(f"{vips:>8} {anterior:>9.3f}s {nuevo:>9.3f}s {anterior / nuevo:>7.0f}x")
+        else:
+            print(f"{vips:>8} {'skipped':>10} {nuevo:>9.3f}s {'':>8}")
+
+
+if __name__ == "__main__":
+    main()
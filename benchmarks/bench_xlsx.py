@@ -0,0 +1,73 @@
+"""Throughput of .xlsx report ingestion: pd.read_excel vs ingestion.leer_xlsx.
+
+    python benchmarks/bench_xlsx.py --rows 200000
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import openpyxl
+import pandas as pd
+
+from ingestion import COLUMNAS_REPORTE, leer_xlsx
+
+
+def generar_xlsx(ruta, filas, columnas_extra=10, semilla=0):
+    # Casino exports carry many columns besides the five the analysis uses
+    rnd = random.Random(semilla)
+    libro = openpyxl.Workbook(write_only=True)
+    ws = libro.create_sheet("Reporte")
+    extra = [f"Extra {i}" for i in range(columnas_extra)]
+    ws.append(COLUMNAS_REPORTE + extra)
+    dia = datetime.datetime(2025, 3, 10)
+    agentes = ["agFenix01", "agEros02", "cajero"]
+    for _ in range(filas):
+        ws.append([
+            dia,
+            f"{rnd.randrange(24):02d}:{rnd.randrange(60):02d}:{rnd.randrange(60):02d}",
+            f"vip{rnd.randrange(5000)}",
+            rnd.choice(agentes),
+            rnd.randrange(100, 20000),
+        ] + [rnd.random() for _ in extra])
+    libro.save(ruta)
+
+
+def medir(funcion, ruta, repeticiones):
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(ruta)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, "reporte.xlsx")
+        generar_xlsx(ruta, args.rows)
+        print(f"{args.rows} rows, {os.path.getsize(ruta) / 1e6:.1f} MB")
+
+        lectores = [
+            ("pd.read_excel", pd.read_excel),
+            ("leer_xlsx", leer_xlsx),
+        ]
+        tiempos = {}
+        for nombre, funcion in lectores:
+            tiempos[nombre] = medir(funcion, ruta, args.repeat)
+            print(f"{nombre:<15} {tiempos[nombre]:8.2f} s {args.rows / tiempos[nombre]:12,.0f} rows/s")
+        print(f"speedup: {tiempos['pd.read_excel'] / tiempos['leer_xlsx']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Synthetic casino reports with matching vip_list / bonos_ofrecidos frames."""
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from ingestion import COLUMNAS_REPORTE
+
+COMUNIDADES = ["Fenix", "Eros"]
+
+
+def generar_vips(vips):
+    return pd.DataFrame({"usuario": [f"vip{i}" for i in range(vips)]})
+
+
+def generar_bonos(bonos_por_dia, dias=1, inicio=datetime.date(2025, 3, 10), semilla=0):
+    """bonos_ofrecidos rows as the sheet returns them: text dates/hours, numeric minimums."""
+    rnd = np.random.default_rng(semilla)
+    n = bonos_por_dia * dias
+    fechas = [(inicio + datetime.timedelta(days=d)).strftime("%d/%m/%Y") for d in range(dias)]
+    h_ini = rnd.integers(0, 24, n)
+    h_fin = np.minimum(h_ini + rnd.integers(0, 8, n), 23)
+    min_carga = rnd.choice([500, 1000, 2000, 3000], n)
+    mejorado = rnd.random(n) < 0.5
+    return pd.DataFrame({
+        "Fecha": np.repeat(fechas, bonos_por_dia),
+        "Comunidad": rnd.choice(COMUNIDADES, n),
+        "Hora inicio": [f"{h}:00" for h in h_ini],
+        "Hora fin": [f"{h}:59" for h in h_fin],
+        "Mínimo carga": min_carga,
+        "Mínimo mejorado": np.where(mejorado, min_carga * 3, "").astype(object),
+        "Bono % base": rnd.choice([10, 15, 20, 25], n),
+        "Bono % mejorado": np.where(mejorado, rnd.choice([30, 40, 50], n), "").astype(object),
+    })
+
+
+def generar_reporte(filas, vip_list, dias=1, inicio=datetime.date(2025, 3, 10),
+                    fraccion_vip=0.6, agentes=40, semilla=0):
+    """Report rows with the five columns the analysis reads, as text like a CSV export.
+
+    Values are drawn from small pools of distinct strings (times of day, users,
+    agents) and indexed, so tens of millions of rows stay cheap to build.
+    """
+    rnd = np.random.default_rng(semilla)
+    fechas = np.array([(inicio + datetime.timedelta(days=d)).isoformat() for d in range(dias)], dtype=object)
+    tiempos = np.array([f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}" for s in range(86_400)], dtype=object)
+    vips = vip_list["usuario"].to_numpy(dtype=object)
+    otros = np.array([f"player{i}" for i in range(max(len(vips), 1) * 4)], dtype=object)
+    nombres_agentes = np.array(
+        [f"ag{COMUNIDADES[i % 2]}{i:02d}" if i % 5 else f"cajero{i:02d}" for i in range(agentes)], dtype=object
+    )
+
+    es_vip = rnd.random(filas) < fraccion_vip
+    usuario = np.where(
+        es_vip,
+        vips[rnd.integers(0, len(vips), filas)] if len(vips) else otros[0],
+        otros[rnd.integers(0, len(otros), filas)],
+    )
+    monto = np.round(rnd.lognormal(7, 1, filas)).astype("int64") + 100
+    df = pd.DataFrame({
+        "Fecha": fechas[np.sort(rnd.integers(0, dias, filas))],
+        "Tiempo": tiempos[rnd.integers(0, len(tiempos), filas)],
+        "Al usuario": usuario,
+        "Del usuario": nombres_agentes[rnd.integers(0, agentes, filas)],
+        "Depositar": monto.astype(str).astype(object),
+    })
+    return df[COLUMNAS_REPORTE]
@@ -0,0 +1,114 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Parsed reports and analysis results shared by every session of the server, so
+# an upload that several analysts open is read and analyzed once and each session
+# holds a reference to the same frames instead of its own copy. Entries are
+# evicted least-recently-used first once their estimated size passes the budget.
+#
+# The budget counts each frame, series and array once, by object identity, even
+# when several entries hold it (the incremental state and the analysis result
+# share their result frame). It is measured when an entry is stored, so it
+# excludes what is attached to a cached value later, such as the search and sort
+# index arrays a TablaPaginada builds on demand, buffers shared between distinct
+# objects (views, slices), and everything sessions hold outside the cache.
+
+PRESUPUESTO_MB = float(os.environ.get("VIP_CACHE_MB", 1024))
+
+
+def _piezas(valor, piezas):
+    # id -> bytes of every frame/series/array inside ``valor``, each object once
+    if id(valor) in piezas:
+        return piezas
+    if isinstance(valor, pd.DataFrame):
+        piezas[id(valor)] = int(valor.memory_usage(index=True, deep=True).sum())
+    elif isinstance(valor, pd.Series):
+        piezas[id(valor)] = int(valor.memory_usage(index=True, deep=True))
+    elif isinstance(valor, np.ndarray):
+        piezas[id(valor)] = valor.nbytes
+    elif isinstance(valor, dict):
+        for v in valor.values():
+            _piezas(v, piezas)
+    elif isinstance(valor, (list, tuple)):
+        for v in valor:
+            _piezas(v, piezas)
+    return piezas
+
+
+def tamano_en_memoria(valor):
+    """Estimated bytes held by the frames and arrays inside ``valor``, each counted once."""
+    return sum(_piezas(valor, {}).values())
+
+
+class CacheCompartida:
+    """Thread-safe LRU mapping with a byte budget and hit/miss/eviction counters."""
+
+    def __init__(self, presupuesto):
+        self.presupuesto = presupuesto
+        self.usado = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self._datos = OrderedDict()
+        self._piezas = {}  # id -> [bytes, entries holding it]
+        self._candado = threading.Lock()
+
+    def obtener(self, clave):
+        """Cached value for ``clave`` (marked as recently used), or None."""
+        with self._candado:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                self.fallos += 1
+                return None
+            self._datos.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[0]
+
+    def _soltar(self, ids):
+        for pieza in ids:
+            registro = self._piezas[pieza]
+            registro[1] -= 1
+            if not registro[1]:
+                self.usado -= registro[0]
+                del self._piezas[pieza]
+
+    def guardar(self, clave, valor):
+        """Store ``valor``, evicting the least recently used entries to fit the budget.
+
+        A value larger than the whole budget is not stored.
+        """
+        piezas = _piezas(valor, {})
+        with self._candado:
+            anterior = self._datos.pop(clave, None)
+            if anterior is not None:
+                self._soltar(anterior[1])
+            if sum(piezas.values()) > self.presupuesto:
+                return
+            for pieza, tamano in piezas.items():
+                registro = self._piezas.setdefault(pieza, [tamano, 0])
+                if not registro[1]:
+                    self.usado += tamano
+                registro[1] += 1
+            self._datos[clave] = (valor, tuple(piezas))
+            while self.usado > self.presupuesto:
+                _, (_, liberadas) = self._datos.popitem(last=False)
+                self._soltar(liberadas)
+                self.desalojos += 1
+
+    def estadisticas(self):
+        with self._candado:
+            return {
+                "entries": len(self._datos),
+                "used_mb": round(self.usado / 2**20, 1),
+                "budget_mb": round(self.presupuesto / 2**20, 1),
+                "hits": self.aciertos,
+                "misses": self.fallos,
+                "evictions": self.desalojos,
+            }
+
+
+cache_compartida = CacheCompartida(PRESUPUESTO_MB * 2**20)
@@ -0,0 +1,300 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from analysis import HORAS_DIA
+
+# Figure builders for the Dashboard and Charts tabs. The rollups they plot are
+# computed once per analysis result by ``calcular_agregados`` and cached with it;
+# the figure functions only lay them out, so they can be built (and timed)
+# outside Streamlit.
+
+CATEGORIAS_RADAR = ['Total Deposit', 'Average Deposit', 'Median Deposit', 'Transaction Count', 'Unique VIPs']
+
+
+def datos_comunidad(resumen):
+    return resumen.groupby('Comunidad').agg({
+        'Monto Total': 'sum',
+        'Usuario': 'nunique'
+    }).reset_index()
+
+
+def figura_depositos_comunidad(community_data):
+    fig = px.pie(
+        community_data,
+        values='Monto Total',
+        names='Comunidad',
+        title='Deposit Distribution by Community',
+        color_discrete_sequence=px.colors.sequential.Plasma,
+        hole=0.4
+    )
+    fig.update_layout(
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='white'),
+        legend=dict(orientation='h', y=-0.1)
+    )
+    return fig
+
+
+def figura_vips_comunidad(community_data):
+    fig = px.bar(
+        community_data,
+        x='Comunidad',
+        y='Usuario',
+        title='Active VIPs by Community',
+        color='Comunidad',
+        color_discrete_sequence=px.colors.sequential.Plasma
+    )
+    fig.update_layout(
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='white'),
+        xaxis=dict(title='Community'),
+        yaxis=dict(title='Number of VIPs')
+    )
+    return fig
+
+
+def figura_top_vips(top_vips):
+    fig = px.bar(
+        top_vips,
+        x='Usuario',
+        y='Monto Total',
+        color='Comunidad',
+        title='Top 10 VIPs by Deposit Amount',
+        color_discrete_sequence=px.colors.sequential.Plasma
+    )
+    fig.update_layout(
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='white'),
+        xaxis=dict(title='VIP User'),
+        yaxis=dict(title='Total Deposit Amount')
+    )
+    return fig
+
+
+def datos_bonos(resumen):
+    bonus_data = resumen[resumen['Bono Usado'] != 'No']
+    return bonus_data.groupby('Bono Usado').agg({
+        'Monto Total': 'sum',
+        'Usuario': 'nunique',
+        'Veces que usó el bono': 'sum'
+    }).reset_index()
+
+
+def figura_monto_bonos(bonus_counts):
+    fig = px.pie(
+        bonus_counts,
+        values='Monto Total',
+        names='Bono Usado',
+        title='Deposit Amount by Bonus Type',
+        color_discrete_sequence=px.colors.sequential.Plasma
+    )
+    fig.update_layout(
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='white')
+    )
+    return fig
+
+
+def figura_usos_bonos(bonus_counts):
+    fig = px.bar(
+        bonus_counts,
+        x='Bono Usado',
+        y='Veces que usó el bono',
+        title='Number of Times Each Bonus Was Used',
+        color='Bono Usado',
+        color_discrete_sequence=px.colors.sequential.Plasma
+    )
+    fig.update_layout(
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='white'),
+        xaxis=dict(title='Bonus Type'),
+        yaxis=dict(title='Usage Count')
+    )
+    return fig
+
+
+def datos_horarios(df_resultado):
+    """Deposit amount and distinct VIPs per hour of the day, all 24 hours present."""
+    hora = df_resultado['Hora'].to_numpy(dtype="int64")
+    monto = np.bincount(hora, weights=df_resultado['Monto'].to_numpy(dtype="float64"), minlength=HORAS_DIA)
+    # Distinct (hour, user) pairs, encoded as one integer each; missing users don't count
+    usuario = df_resultado['Usuario'].cat.codes.to_numpy(dtype="int64")
+    n_usuarios = usuario.max(initial=-1) + 1
+    pares = np.unique((hora * n_usuarios + usuario)[usuario >= 0])
+    usuarios = np.bincount(pares // max(n_usuarios, 1), minlength=HORAS_DIA)
+    return pd.DataFrame({'Hour': np.arange(HORAS_DIA), 'Monto': monto, 'Usuario': usuarios})
+
+
+def figura_horaria(hourly_data):
+    fig = go.Figure()
+
+    fig.add_trace(go.Scatter(
+        x=hourly_data['Hour'],
+        y=hourly_data['Monto'],
+        mode='lines+markers',
+        name='Deposit Amount',
+        line=dict(color='#FFD700', width=3),
+        marker=dict(size=8, color='#FFD700')
+    ))
+
+    fig.add_trace(go.Bar(
+        x=hourly_data['Hour'],
+        y=hourly_data['Usuario'],
+        name='Active VIPs',
+        marker_color='rgba(75, 192, 192, 0.7)'
+    ))
+
+    fig.update_layout(
+        title='Hourly Activity Distribution',
+        xaxis=dict(
+            title='Hour of Day',
+            tickmode='linear',
+            tick0=0,
+            dtick=1
+        ),
+        yaxis=dict(title='Deposit Amount'),
+        yaxis2=dict(
+            title='Number of VIPs',
+            overlaying='y',
+            side='right'
+        ),
+        legend=dict(x=0.01, y=0.99),
+        hovermode='x unified',
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='white')
+    )
+    return fig
+
+
+def metricas_comunidad(df_resultado):
+    community_metrics = df_resultado.groupby('Comunidad', observed=True).agg({
+        'Monto': ['sum', 'mean', 'median', 'count'],
+        'Usuario': 'nunique'
+    }).reset_index()
+
+    community_metrics.columns = ['Comunidad'] + CATEGORIAS_RADAR
+
+    community_metrics['Comunidad'] = community_metrics['Comunidad'].astype(object)
+
+    # Filter out empty community
+    return community_metrics[community_metrics['Comunidad'] != '']
+
+
+def normalizar_radar(community_metrics):
+    """Each metric divided by its largest value across communities (0 when that is 0)."""
+    valores = community_metrics.set_index('Comunidad')[CATEGORIAS_RADAR].astype("float64")
+    maximos = valores.max()
+    return valores.div(maximos.where(maximos > 0)).fillna(0)
+
+
+def figura_radar(radar):
+    fig = go.Figure()
+
+    # Communities are user-defined, so the palette wraps around
+    colores = px.colors.qualitative.Plotly
+    for i, (community, values) in enumerate(radar.iterrows()):
+        fig.add_trace(go.Scatterpolar(
+            r=values.tolist(),
+            theta=CATEGORIAS_RADAR,
+            fill='toself',
+            name=community,
+            line_color=colores[i % len(colores)]
+        ))
+
+    fig.update_layout(
+        polar=dict(
+            radialaxis=dict(
+                visible=True,
+                range=[0, 1]
+            )
+        ),
+        title='Community Performance Comparison',
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='white')
+    )
+    return fig
+
+
+def figura_tendencia(tendencia, titulo, conteo, nombre_conteo):
+    """Daily deposits (line) against a daily count (bars) from a ``history`` trend."""
+    fig = go.Figure()
+
+    fig.add_trace(go.Scatter(
+        x=tendencia['fecha'],
+        y=tendencia['monto'],
+        mode='lines+markers',
+        name='Deposit Amount',
+        line=dict(color='#FFD700', width=3),
+        marker=dict(size=6, color='#FFD700')
+    ))
+
+    fig.add_trace(go.Bar(
+        x=tendencia['fecha'],
+        y=tendencia[conteo],
+        name=nombre_conteo,
+        yaxis='y2',
+        marker_color='rgba(75, 192, 192, 0.7)'
+    ))
+
+    fig.update_layout(
+        title=titulo,
+        xaxis=dict(title='Day'),
+        yaxis=dict(title='Deposit Amount'),
+        yaxis2=dict(
+            title=nombre_conteo,
+            overlaying='y',
+            side='right'
+        ),
+        legend=dict(x=0.01, y=0.99),
+        hovermode='x unified',
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='white')
+    )
+    return fig
+
+
+def calcular_agregados(resumen, df_resultado):
+    """Every rollup the Dashboard and Charts tabs show, computed once per result."""
+    activos = int((resumen['Monto Total'] > 0).sum())
+    comunidades = metricas_comunidad(df_resultado)
+    return {
+        "metricas": {
+            "activos": activos,
+            "total": resumen['Monto Total'].sum(),
+            "usos": resumen['Veces que usó el bono'].sum(),
+            "participacion": activos / len(resumen) * 100 if len(resumen) > 0 else 0,
+        },
+        "comunidad": datos_comunidad(resumen),
+        "top_vips": resumen.sort_values('Monto Total', ascending=False).head(10),
+        "bonos": datos_bonos(resumen),
+        "horario": datos_horarios(df_resultado),
+        "comunidades": comunidades,
+        "radar": normalizar_radar(comunidades),
+    }
+
+
+# Figure name -> builder over the ``calcular_agregados`` rollups
+FIGURAS = {
+    "depositos_comunidad": lambda agregados: figura_depositos_comunidad(agregados["comunidad"]),
+    "vips_comunidad": lambda agregados: figura_vips_comunidad(agregados["comunidad"]),
+    "top_vips": lambda agregados: figura_top_vips(agregados["top_vips"]),
+    "monto_bonos": lambda agregados: figura_monto_bonos(agregados["bonos"]),
+    "usos_bonos": lambda agregados: figura_usos_bonos(agregados["bonos"]),
+    "horaria": lambda agregados: figura_horaria(agregados["horario"]),
+    "radar": lambda agregados: figura_radar(agregados["radar"]),
+}
+
+
+def construir_figuras(agregados):
+    """Every figure of the Dashboard and Charts tabs, keyed by name."""
+    return {nombre: construir(agregados) for nombre, construir in FIGURAS.items()}
@@ -0,0 +1,152 @@
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Per-stage wall time, row counts and peak memory of a run (one Streamlit rerun or
+# one batch report). Stages are only measured while a run is active on the current
+# thread; otherwise ``etapa`` is a bare context manager and costs next to nothing.
+
+ACTIVADO_POR_DEFECTO = os.environ.get("VIP_DIAGNOSTICS", "") not in ("", "0")
+
+# How often the resident set size is sampled while a stage is open
+INTERVALO_MUESTREO = 0.005
+
+logger = logging.getLogger("vip.diagnostics")
+
+_corrida_actual = contextvars.ContextVar("corrida_actual", default=None)
+
+_PAGINA = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def memoria_residente():
+    """Current RSS in bytes (the process high-water mark where that is all there is)."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGINA
+    except (OSError, IndexError, ValueError):
+        pass
+    if resource is not None:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    return 0
+
+
+# RSS is sampled by one background thread, and only while some stage is open.
+# Memory is process-wide, so stages running at the same time in other sessions
+# show up in each other's peaks.
+_candado = threading.Lock()
+_abiertas = []  # one-element [peak] cells of the open stages
+_muestreador = None
+
+
+def _muestrear():
+    global _muestreador
+    while True:
+        rss = memoria_residente()
+        with _candado:
+            if not _abiertas:
+                _muestreador = None
+                return
+            for celda in _abiertas:
+                celda[0] = max(celda[0], rss)
+        time.sleep(INTERVALO_MUESTREO)
+
+
+def _abrir(celda):
+    global _muestreador
+    with _candado:
+        _abiertas.append(celda)
+        if _muestreador is None:
+            _muestreador = threading.Thread(target=_muestrear, name="vip-diagnostics", daemon=True)
+            _muestreador.start()
+
+
+def _cerrar(celda):
+    rss = memoria_residente()
+    with _candado:
+        _abiertas.remove(celda)
+    return max(celda[0], rss)
+
+
+class Corrida:
+    """Stages recorded during one run, in completion order."""
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex[:8]
+        self.etapas = []
+
+    def tabla(self):
+        return [{k: v for k, v in e.items() if k != "run"} for e in self.etapas]
+
+
+def _configurar_registro():
+    # Streamlit never configures logging, so without a handler of its own the
+    # stage records would be dropped at the default WARNING level
+    with _candado:
+        if not logger.handlers:
+            manejador = logging.StreamHandler(sys.stderr)
+            manejador.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(manejador)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+
+
+def iniciar_corrida(activa=ACTIVADO_POR_DEFECTO):
+    """Start recording stages on this thread; returns the run, or None when disabled.
+
+    Each stage is also logged as a JSON line to stderr.
+    """
+    corrida = Corrida() if activa else None
+    if activa:
+        _configurar_registro()
+    _corrida_actual.set(corrida)
+    return corrida
+
+
+def terminar_corrida():
+    corrida = _corrida_actual.get()
+    _corrida_actual.set(None)
+    return corrida
+
+
+@contextlib.contextmanager
+def etapa(nombre, filas=None):
+    """Measure the enclosed block as stage ``nombre``.
+
+    Yields a dict whose "filas" entry can be set inside the block once the row
+    count is known.
+    """
+    corrida = _corrida_actual.get()
+    medicion = {"filas": filas}
+    if corrida is None:
+        yield medicion
+        return
+
+    base = memoria_residente()
+    celda = [base]
+    _abrir(celda)
+    inicio = time.perf_counter()
+    try:
+        yield medicion
+    finally:
+        segundos = time.perf_counter() - inicio
+        pico = _cerrar(celda)
+        registro = {
+            "run": corrida.id,
+            "stage": nombre,
+            "seconds": round(segundos, 6),
+            "rows": medicion["filas"],
+            "peak_mb": round((pico - base) / 2**20, 3),
+        }
+        corrida.etapas.append(registro)
+        logger.info(json.dumps(registro))
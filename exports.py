@@ -0,0 +1,225 @@
+import os
+import re
+import shutil
+import threading
+import zipfile
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Downloads of analysis results, generated on request and kept on disk per result
+# version, so a file is built at most once per result and format:
+#   <DIRECTORIO_EXPORTES>/<version>/<nombre>.<ext>
+# Every format is written a slice of rows at a time, so only one slice is ever
+# formatted in memory.
+DIRECTORIO_EXPORTES = os.environ.get("VIP_EXPORTS_DIR", os.path.join("data", "exportes"))
+
+# Result versions whose files are kept; older ones are deleted as new ones appear
+MAX_VERSIONES = 20
+
+TAMANO_TROZO = 100_000
+
+FORMATOS = {
+    "csv": ("CSV", "text/csv"),
+    "parquet": ("Parquet", "application/vnd.apache.parquet"),
+    "xlsx": ("Excel", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+_candados = {}
+_candado = threading.Lock()
+
+
+def _trozos(df, tamano):
+    for inicio in range(0, max(len(df), 1), tamano):
+        yield inicio, df.iloc[inicio:inicio + tamano]
+
+
+def _escribir_csv(destino, df, formatear, tamano):
+    with open(destino, "w", encoding="utf-8", newline="") as f:
+        for inicio, trozo in _trozos(df, tamano):
+            formatear(trozo).to_csv(f, header=inicio == 0, index=False)
+
+
+def _es_texto(serie):
+    return not (pd.api.types.is_numeric_dtype(serie) or pd.api.types.is_datetime64_any_dtype(serie)
+                or pd.api.types.is_timedelta64_dtype(serie))
+
+
+def _como_texto(serie):
+    # Label columns mix report text with numeric ids from the VIP sheet; each
+    # distinct value is turned into text once
+    codigos, unicos = pd.factorize(serie)
+    textos = np.array([str(v) for v in unicos] + [None], dtype=object)
+    return pd.Series(textos[codigos], index=serie.index, dtype=object)
+
+
+def _esquema_parquet(df):
+    # Fixed from the frame's dtypes up front, so a slice whose column is all
+    # missing can't change it: text-like columns are strings, the rest keep their type
+    campos = []
+    for columna in df.columns:
+        if _es_texto(df[columna]):
+            tipo = pa.string()
+        else:
+            tipo = pa.Schema.from_pandas(df[[columna]].iloc[:0], preserve_index=False).field(0).type
+        campos.append(pa.field(str(columna), tipo))
+    return pa.schema(campos)
+
+
+def _escribir_parquet(destino, df, formatear, tamano):
+    # Parquet keeps the typed columns (dates, durations, numbers) rather than their
+    # display text
+    esquema = _esquema_parquet(df)
+    texto = [columna for columna in df.columns if _es_texto(df[columna])]
+    with pq.ParquetWriter(destino, esquema) as escritor:
+        for _, trozo in _trozos(df, tamano):
+            trozo = trozo.assign(**{columna: _como_texto(trozo[columna]) for columna in texto})
+            escritor.write_table(pa.Table.from_pandas(trozo, schema=esquema, preserve_index=False))
+
+
+# Minimal SpreadsheetML package: worksheets of inline-string and number cells.
+# Excel can't open a sheet past MAX_FILAS_XLSX rows, so longer results continue
+# on further sheets, each with its own header row.
+MAX_FILAS_XLSX = 1_048_576
+
+_TIPOS_CONTENIDO = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '{hojas}'
+    '</Types>'
+)
+_TIPO_HOJA = (
+    '<Override PartName="/xl/worksheets/sheet{n}.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+)
+_RELACIONES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_LIBRO = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets>{hojas}</sheets>'
+    '</workbook>'
+)
+_HOJA_LIBRO = '<sheet name="{hoja}" sheetId="{n}" r:id="rId{n}"/>'
+_RELACIONES_LIBRO = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '{hojas}'
+    '</Relationships>'
+)
+_RELACION_HOJA = (
+    '<Relationship Id="rId{n}" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet{n}.xml"/>'
+)
+_INICIO_HOJA = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_FIN_HOJA = '</sheetData></worksheet>'
+
+# Characters XML 1.0 can't carry at all
+_CONTROL = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def _celdas_texto(valores):
+    # Each distinct text is escaped once; missing values become empty cells
+    codigos, unicos = pd.factorize(pd.Series(valores, dtype=object))
+    celdas = np.array(
+        [f'<c t="inlineStr"><is><t xml:space="preserve">{escape(_CONTROL.sub("", str(v)))}</t></is></c>'
+         for v in unicos] + ["<c/>"],
+        dtype=object,
+    )
+    return celdas[codigos]
+
+
+def _celdas_numero(valores):
+    numeros = np.asarray(valores, dtype="float64")
+    celdas = "<c><v>" + pd.Series(numeros).astype(str).to_numpy(dtype=object) + "</v></c>"
+    celdas[~np.isfinite(numeros)] = "<c/>"
+    return celdas
+
+
+def _filas_xml(df):
+    filas = np.full(len(df), "<row>", dtype=object)
+    for columna in df.columns:
+        serie = df[columna]
+        if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+            filas += _celdas_numero(serie)
+        else:
+            filas += _celdas_texto(serie)
+    filas += "</row>"
+    return "".join(filas)
+
+
+def _escribir_xlsx(destino, df, formatear, tamano, hoja="Data"):
+    capacidad = MAX_FILAS_XLSX - 1  # data rows per sheet, below the header
+    numeros = range(1, max(-(-len(df) // capacidad), 1) + 1)
+    nombres = [hoja if n == 1 else f"{hoja} {n}" for n in numeros]
+    with zipfile.ZipFile(destino, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("[Content_Types].xml", _TIPOS_CONTENIDO.format(hojas="".join(_TIPO_HOJA.format(n=n) for n in numeros)))
+        zf.writestr("_rels/.rels", _RELACIONES)
+        zf.writestr("xl/workbook.xml", _LIBRO.format(
+            hojas="".join(_HOJA_LIBRO.format(hoja=escape(nombre), n=n) for n, nombre in zip(numeros, nombres))))
+        zf.writestr("xl/_rels/workbook.xml.rels", _RELACIONES_LIBRO.format(
+            hojas="".join(_RELACION_HOJA.format(n=n) for n in numeros)))
+        for n in numeros:
+            parte_df = df.iloc[(n - 1) * capacidad:n * capacidad]
+            with zf.open(f"xl/worksheets/sheet{n}.xml", "w", force_zip64=True) as parte:
+                parte.write(_INICIO_HOJA.encode())
+                for inicio, trozo in _trozos(parte_df, tamano):
+                    texto = formatear(trozo)
+                    if inicio == 0:
+                        parte.write(_filas_xml(pd.DataFrame([list(texto.columns)], dtype=object)).encode())
+                    parte.write(_filas_xml(texto).encode())
+                parte.write(_FIN_HOJA.encode())
+
+
+_ESCRITORES = {"csv": _escribir_csv, "parquet": _escribir_parquet, "xlsx": _escribir_xlsx}
+
+
+def _podar(directorio, conservar):
+    versiones = [os.path.join(directorio, d) for d in os.listdir(directorio)]
+    versiones = sorted((d for d in versiones if os.path.isdir(d)), key=os.path.getmtime, reverse=True)
+    for vieja in versiones[conservar:]:
+        shutil.rmtree(vieja, ignore_errors=True)
+    return set(versiones[conservar:])
+
+
+def exportar(df, formatear, formato, version, nombre, directorio=DIRECTORIO_EXPORTES, tamano=TAMANO_TROZO):
+    """Path of ``df`` exported as ``formato``, building the file on first request.
+
+    ``formatear`` turns a slice of ``df`` into its display text (CSV and Excel);
+    Parquet is written from the typed frame. Files live under ``version`` so a
+    new result never serves a stale file, and concurrent requests for the same
+    file wait for a single build.
+    """
+    destino = os.path.join(directorio, version, f"{nombre}.{formato}")
+    with _candado:
+        candado = _candados.setdefault(destino, threading.Lock())
+    with candado:
+        if not os.path.exists(destino):
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            temporal = destino + ".tmp"
+            _ESCRITORES[formato](temporal, df, formatear, tamano)
+            os.replace(temporal, destino)
+            borradas = _podar(directorio, MAX_VERSIONES)
+            with _candado:
+                # A request already holding one of these locks still builds its file
+                for ruta in [r for r in _candados if os.path.dirname(r) in borradas]:
+                    del _candados[ruta]
+    return destino
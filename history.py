@@ -0,0 +1,170 @@
+import contextlib
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+# Per-day activity of every analyzed report, kept in one SQLite file so trends
+# over weeks or months are answered by indexed queries instead of re-running the
+# analysis. Only participation rows are stored (non-participants are implied by
+# the day being present in ``dias``), keyed by ISO date text so ranges sort.
+ARCHIVO_HISTORIAL = os.environ.get("VIP_HISTORIAL", os.path.join("data", "historial.sqlite"))
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS dias (
+    fecha TEXT PRIMARY KEY,
+    usuarios INTEGER NOT NULL,
+    guardado TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS actividad (
+    fecha TEXT NOT NULL,
+    usuario TEXT NOT NULL,
+    comunidad TEXT NOT NULL,
+    bono TEXT NOT NULL,
+    monto REAL NOT NULL,
+    hora_carga INTEGER,
+    usos INTEGER NOT NULL,
+    porcentaje REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS actividad_usuario_fecha ON actividad (usuario, fecha);
+CREATE INDEX IF NOT EXISTS actividad_comunidad_fecha ON actividad (comunidad, fecha);
+"""
+
+
+@contextlib.contextmanager
+def _conexion(archivo):
+    os.makedirs(os.path.dirname(archivo) or ".", exist_ok=True)
+    conexion = sqlite3.connect(archivo, timeout=30)
+    try:
+        # WAL lets the History view read while another session is writing a day
+        conexion.execute("PRAGMA journal_mode=WAL")
+        conexion.execute("PRAGMA synchronous=NORMAL")
+        conexion.executescript(_ESQUEMA)
+        with conexion:
+            yield conexion
+    finally:
+        conexion.close()
+
+
+def guardar_historial(diario, archivo=ARCHIVO_HISTORIAL):
+    """Store a ``resumen_diario`` frame, replacing whatever was stored for its days.
+
+    Re-analyzing a day (a later export, new bonus rules) leaves a single copy of
+    it. Returns the number of activity rows written.
+    """
+    if diario.empty:
+        return 0
+    # Dates repeat on every row: format each distinct day once
+    codigos, unicos = pd.factorize(diario["Fecha"])
+    fechas = np.array([dia.strftime("%Y-%m-%d") for dia in unicos], dtype=object)[codigos]
+    # Users in each day's summary: every VIP plus anyone else who took a bonus
+    usuarios = diario.groupby(fechas, sort=True)["Usuario"].nunique()
+    guardado = pd.Timestamp.now(tz="UTC").isoformat(timespec="seconds")
+
+    participo = (diario["Bono Usado"] != "No").to_numpy()
+    activos = diario[participo]
+    segundos = (activos["Hora de carga"] // pd.Timedelta(seconds=1)).to_numpy(dtype="float64")
+    # Plain Python values, built column-wise, so sqlite3 binds them without conversions
+    filas = zip(
+        fechas[participo].tolist(),
+        activos["Usuario"].astype(str).tolist(),
+        activos["Comunidad"].astype(str).tolist(),
+        activos["Bono Usado"].astype(str).tolist(),
+        activos["Monto Total"].to_numpy(dtype="float64").tolist(),
+        np.where(np.isnan(segundos), None, np.nan_to_num(segundos).astype("int64").astype(object)).tolist(),
+        activos["Veces que usó el bono"].to_numpy(dtype="int64").tolist(),
+        # A day whose total is 0 has no share (NaN); stored as 0
+        np.nan_to_num(activos["% del Total"].to_numpy(dtype="float64")).tolist(),
+    )
+
+    with _conexion(archivo) as conexion:
+        # One pass over the table for all the days being replaced
+        dias = usuarios.index.tolist()
+        for i in range(0, len(dias), 500):
+            lote = dias[i:i + 500]
+            conexion.execute(f"DELETE FROM actividad WHERE fecha IN ({', '.join('?' * len(lote))})", lote)
+        conexion.executemany(
+            "INSERT OR REPLACE INTO dias (fecha, usuarios, guardado) VALUES (?, ?, ?)",
+            [(fecha, int(n), guardado) for fecha, n in usuarios.items()],
+        )
+        conexion.executemany("INSERT INTO actividad VALUES (?, ?, ?, ?, ?, ?, ?, ?)", filas)
+    return int(participo.sum())
+
+
+def _consultar(sql, parametros, archivo):
+    if not os.path.exists(archivo):
+        return None
+    with _conexion(archivo) as conexion:
+        return pd.read_sql_query(sql, conexion, params=parametros)
+
+
+def rango_historial(archivo=ARCHIVO_HISTORIAL):
+    """``(first day, last day)`` stored, or None when the history is empty."""
+    rango = _consultar("SELECT MIN(fecha) AS desde, MAX(fecha) AS hasta FROM dias", (), archivo)
+    if rango is None or rango["desde"].isna().all():
+        return None
+    return tuple(pd.Timestamp(v).date() for v in rango.iloc[0])
+
+
+def comunidades_historial(archivo=ARCHIVO_HISTORIAL):
+    comunidades = _consultar(
+        "SELECT DISTINCT comunidad FROM actividad WHERE comunidad <> '' ORDER BY comunidad", (), archivo
+    )
+    return [] if comunidades is None else comunidades["comunidad"].tolist()
+
+
+def _por_dia(tendencia, desde, hasta, archivo):
+    # Days that were analyzed but had no activity for the filter show up as zeros
+    dias = _consultar("SELECT fecha FROM dias WHERE fecha BETWEEN ? AND ? ORDER BY fecha",
+                      (desde.isoformat(), hasta.isoformat()), archivo)
+    tendencia = dias.merge(tendencia, on="fecha", how="left").fillna(0)
+    tendencia["fecha"] = pd.to_datetime(tendencia["fecha"])
+    return tendencia
+
+
+def tendencia_vip(usuario, desde, hasta, archivo=ARCHIVO_HISTORIAL):
+    """Per-day deposits, bonus uses and distinct bonuses of one VIP."""
+    tendencia = _consultar(
+        """
+        SELECT fecha, SUM(monto) AS monto, SUM(usos) AS usos, COUNT(*) AS bonos
+        FROM actividad
+        WHERE usuario = ? AND fecha BETWEEN ? AND ?
+        GROUP BY fecha
+        """,
+        (str(usuario), desde.isoformat(), hasta.isoformat()), archivo,
+    )
+    if tendencia is None:
+        return pd.DataFrame(columns=["fecha", "monto", "usos", "bonos"])
+    return _por_dia(tendencia, desde, hasta, archivo)
+
+
+def tendencia_comunidad(comunidad, desde, hasta, archivo=ARCHIVO_HISTORIAL):
+    """Per-day deposits, bonus uses and active VIPs of one community."""
+    tendencia = _consultar(
+        """
+        SELECT fecha, SUM(monto) AS monto, SUM(usos) AS usos, COUNT(DISTINCT usuario) AS vips
+        FROM actividad
+        WHERE comunidad = ? AND fecha BETWEEN ? AND ?
+        GROUP BY fecha
+        """,
+        (comunidad, desde.isoformat(), hasta.isoformat()), archivo,
+    )
+    if tendencia is None:
+        return pd.DataFrame(columns=["fecha", "monto", "usos", "vips"])
+    return _por_dia(tendencia, desde, hasta, archivo)
+
+
+def bonos_vip(usuario, desde, hasta, archivo=ARCHIVO_HISTORIAL):
+    """Totals per bonus label for one VIP over the range, most used first."""
+    bonos = _consultar(
+        """
+        SELECT bono, SUM(usos) AS usos, SUM(monto) AS monto, COUNT(*) AS dias
+        FROM actividad
+        WHERE usuario = ? AND fecha BETWEEN ? AND ?
+        GROUP BY bono
+        ORDER BY usos DESC, bono
+        """,
+        (str(usuario), desde.isoformat(), hasta.isoformat()), archivo,
+    )
+    return pd.DataFrame(columns=["bono", "usos", "monto", "dias"]) if bonos is None else bonos
@@ -0,0 +1,541 @@
+import csv
+import datetime
+import html
+import os
+import posixpath
+import re
+import unicodedata
+import zipfile
+from xml.etree import ElementTree
+
+import pandas as pd
+
+from analysis import (
+    COMUNIDADES_POR_DEFECTO,
+    agregar_participacion,
+    clasificar_depositos,
+    combinar_parciales,
+    compilar_bonos,
+    completar_resumen,
+    concatenar_resultados,
+    filtrar_reporte,
+)
+from diagnostics import etapa
+
+# Only these columns of the casino export are used by the analysis
+COLUMNAS_REPORTE = ["Fecha", "Tiempo", "Al usuario", "Del usuario", "Depositar"]
+
+# Header names accepted for each report column, compared ignoring case, accents
+# and extra spaces. When a file has more than one of them the first listed wins.
+ALIAS_COLUMNAS = {
+    "Fecha": ("Fecha", "Date"),
+    "Tiempo": ("Tiempo", "Hora", "Time"),
+    "Al usuario": ("Al usuario", "A usuario", "To user"),
+    "Del usuario": ("Del usuario", "De usuario", "From user"),
+    "Depositar": ("Depositar", "Depósito", "Deposit"),
+}
+
+# Explicit formats, tried in order: ISO first, then day-first as the casino
+# back office writes them. Nothing is left to format inference.
+FORMATOS_FECHA = ("%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%d/%m/%Y", "%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M")
+
+TAMANO_BLOQUE = 200_000
+
+# CSV uploads larger than this are analyzed chunk by chunk instead of being read whole
+UMBRAL_BLOQUES = float(os.environ.get("VIP_STREAM_MB", 256)) * 2**20
+
+# The header is looked for in this many leading bytes of a CSV
+TAMANO_ENCABEZADO = 64 * 1024
+
+
+def _normalizar_nombre(nombre):
+    sin_acentos = unicodedata.normalize("NFKD", str(nombre))
+    sin_acentos = "".join(c for c in sin_acentos if not unicodedata.combining(c))
+    return " ".join(sin_acentos.casefold().split())
+
+
+_COLUMNA_POR_ALIAS = {
+    _normalizar_nombre(alias): (columna, prioridad)
+    for columna, alias_columna in ALIAS_COLUMNAS.items()
+    for prioridad, alias in enumerate(alias_columna)
+}
+
+
+def ubicar_columnas(encabezado):
+    """``{report column: key}`` for the header cells of a report.
+
+    ``encabezado`` maps each cell's key (a CSV header name, an .xlsx column index)
+    to its text. Raises ``ValueError`` naming every missing column.
+    """
+    elegidas = {}
+    for clave, nombre in encabezado.items():
+        if nombre is None:
+            continue
+        columna, prioridad = _COLUMNA_POR_ALIAS.get(_normalizar_nombre(nombre), (None, None))
+        if columna is not None and (columna not in elegidas or prioridad < elegidas[columna][1]):
+            elegidas[columna] = (clave, prioridad)
+    faltantes = [col for col in COLUMNAS_REPORTE if col not in elegidas]
+    if faltantes:
+        aceptados = "; ".join(f"{col}: {', '.join(ALIAS_COLUMNAS[col])}" for col in faltantes)
+        raise ValueError(f"Missing required columns: {', '.join(faltantes)} (accepted headers — {aceptados})")
+    return {col: elegidas[col][0] for col in COLUMNAS_REPORTE}
+
+
+def leer_encabezado_csv(origen, limite=TAMANO_ENCABEZADO):
+    """Header names of a CSV report, read from its first bytes only."""
+    if hasattr(origen, "read"):
+        posicion = origen.tell()
+        inicio = origen.read(limite)
+        origen.seek(posicion)
+    else:
+        with open(origen, "rb") as f:
+            inicio = f.read(limite)
+    if isinstance(inicio, bytes):
+        inicio = inicio.decode("utf-8-sig", errors="replace")
+    primera = inicio.lstrip("\ufeff").splitlines()[:1]
+    return next(csv.reader(primera), [])
+
+
+def _convertir_unicos(serie, convertir):
+    # Each distinct value is converted once and broadcast back. Returns the column
+    # and how many present values could not be converted.
+    codigos, unicos = pd.factorize(serie)
+    convertidos = convertir(pd.Series(unicos, dtype=object).astype(str).str.strip())
+    fallos = int(convertidos.isna().to_numpy()[codigos[codigos >= 0]].sum())
+    return pd.Series(convertidos.array.take(codigos, allow_fill=True), index=serie.index), fallos
+
+
+def _parsear_fecha(textos):
+    fechas = pd.to_datetime(textos, format=FORMATOS_FECHA[0], errors="coerce")
+    for formato in FORMATOS_FECHA[1:]:
+        faltan = fechas.isna()
+        if not faltan.any():
+            break
+        fechas[faltan] = pd.to_datetime(textos[faltan], format=formato, errors="coerce")
+    return fechas
+
+
+# Tiempo is "%H:%M:%S"; checking the shape is much cheaper than strptime
+# on the ~86k distinct times of a day
+_PATRON_TIEMPO = r"(?:[01]?\d|2[0-3]):[0-5]?\d:[0-5]?\d"
+
+
+def _parsear_tiempo(textos):
+    # Kept as text (what the analysis and the store expect); invalid times become missing
+    return textos.where(textos.str.fullmatch(_PATRON_TIEMPO).astype(bool))
+
+
+def _parsear_monto(serie):
+    # Amounts are mostly distinct, so they are converted in one vectorized pass
+    montos = pd.to_numeric(serie, errors="coerce")
+    return montos, int((montos.isna() & serie.notna()).sum())
+
+
+def aplicar_esquema(df):
+    """Report columns with Fecha, Tiempo and Depositar parsed by their explicit formats.
+
+    Values that don't parse are left missing rather than failing the read; their
+    count per column is kept in ``attrs["fallos_conversion"]``.
+    """
+    tipado = df[COLUMNAS_REPORTE].copy()
+    fallos = {}
+    if not pd.api.types.is_datetime64_any_dtype(tipado["Fecha"]):
+        tipado["Fecha"], fallos["Fecha"] = _convertir_unicos(tipado["Fecha"], _parsear_fecha)
+    tipado["Tiempo"], fallos["Tiempo"] = _convertir_unicos(tipado["Tiempo"], _parsear_tiempo)
+    if not pd.api.types.is_numeric_dtype(tipado["Depositar"]):
+        tipado["Depositar"], fallos["Depositar"] = _parsear_monto(tipado["Depositar"])
+    tipado.attrs["fallos_conversion"] = {col: n for col, n in fallos.items() if n}
+    return tipado
+
+
+def aviso_conversion(fallos):
+    """Warning text for the ``fallos_conversion`` counts of a report, or None."""
+    if not fallos:
+        return None
+    detalle = ", ".join(f"{col}: {n:,}" for col, n in fallos.items())
+    return (f"Some report values could not be parsed and were left empty ({detalle}). "
+            "Rows without a valid Fecha or Tiempo are left out of the analysis and deposits "
+            "without a valid amount count as 0.")
+
+
+def sumar_fallos(total, bloque):
+    """Add a parsed chunk's ``fallos_conversion`` counts into ``total``."""
+    for col, n in bloque.attrs.get("fallos_conversion", {}).items():
+        total[col] = total.get(col, 0) + n
+    return total
+
+
+def leer_csv_por_bloques(origen, tamano_bloque=TAMANO_BLOQUE):
+    """Iterate over a CSV report in bounded, schema-parsed chunks of the report columns.
+
+    The header is validated before any row is read.
+    """
+    columnas = ubicar_columnas({nombre: nombre for nombre in leer_encabezado_csv(origen)})
+    nombres = {archivo: col for col, archivo in columnas.items()}
+    # Read as text: the schema parses each column with its explicit format
+    lector = pd.read_csv(
+        origen,
+        usecols=list(nombres),
+        dtype={nombre: str for nombre in nombres},
+        chunksize=tamano_bloque,
+    )
+    for bloque in lector:
+        yield aplicar_esquema(bloque.rename(columns=nombres))
+
+
+def leer_csv(origen, tamano_bloque=TAMANO_BLOQUE):
+    # Chunked so the unused columns are never materialized for the whole file
+    bloques = list(leer_csv_por_bloques(origen, tamano_bloque))
+    if not bloques:
+        return aplicar_esquema(pd.DataFrame(columns=COLUMNAS_REPORTE))
+    df = pd.concat(bloques, ignore_index=True)
+    fallos = {}
+    for bloque in bloques:
+        sumar_fallos(fallos, bloque)
+    df.attrs["fallos_conversion"] = fallos
+    return df
+
+
+# --- XLSX ---
+# .xlsx files are zip archives of SpreadsheetML parts. Only the chosen sheet part is
+# decompressed, as a stream, and only the cells of the five report columns are
+# decoded, instead of building a cell object per value like openpyxl/pd.read_excel.
+_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_NS_PAQUETE = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+# Built-in number formats that hold dates or times
+_FORMATOS_FECHA = set(range(14, 23)) | {45, 46, 47}
+
+TAMANO_BLOQUE_XML = 4 * 1024 * 1024
+
+# Excel, LibreOffice, Google Sheets and openpyxl all write the cell reference as
+# the first attribute, which lets a regex pick the wanted columns straight out of
+# the XML. Sheets written any other way go through the iterparse reader.
+_CELDA = re.compile(rb'<(?:\w+:)?c r="([A-Z]+)(\d+)"([^>]*?)(?:/>|>(.*?)</(?:\w+:)?c>)', re.S)
+_CELDA_SIN_REFERENCIA = re.compile(rb'<(?:\w+:)?c(?=[\s/>])(?!\s+r=")')
+_ATRIBUTO_TIPO = re.compile(rb'\bt="(\w+)"')
+_ATRIBUTO_ESTILO = re.compile(rb'\bs="(\d+)"')
+_VALOR = re.compile(rb'<(?:\w+:)?v>(.*?)</(?:\w+:)?v>', re.S)
+_TEXTO_EN_LINEA = re.compile(rb'<(?:\w+:)?t(?:\s[^>]*)?>(.*?)</(?:\w+:)?t>', re.S)
+
+
+class _SinReferencias(Exception):
+    pass
+
+
+def _indice_columna(referencia):
+    indice = 0
+    for letra in referencia:
+        if letra.isdigit():
+            break
+        indice = indice * 26 + ord(letra) - 64
+    return indice - 1
+
+
+def _texto(elemento):
+    return "".join(t.text or "" for t in elemento.iter(_NS + "t"))
+
+
+def _partes_libro(zf, hoja):
+    # Resolve the sheet part (first sheet by default, like pd.read_excel) and the
+    # workbook date system
+    with zf.open("xl/workbook.xml") as f:
+        libro = ElementTree.parse(f).getroot()
+    propiedades = libro.find(_NS + "workbookPr")
+    fecha_1904 = propiedades is not None and propiedades.get("date1904") in ("1", "true")
+    hojas = libro.find(_NS + "sheets").findall(_NS + "sheet")
+    if hoja is None:
+        elegida = hojas[0]
+    else:
+        elegida = next((h for h in hojas if h.get("name") == hoja), None)
+        if elegida is None:
+            raise ValueError(f"Worksheet {hoja!r} not found")
+
+    with zf.open("xl/_rels/workbook.xml.rels") as f:
+        relaciones = {r.get("Id"): r.get("Target") for r in ElementTree.parse(f).getroot().iter(_NS_PAQUETE + "Relationship")}
+    destino = relaciones[elegida.get(_NS_REL + "id")]
+    ruta = destino.lstrip("/") if destino.startswith("/") else posixpath.normpath(posixpath.join("xl", destino))
+    return ruta, fecha_1904
+
+
+class _TextosCompartidos:
+    """Shared strings of a workbook, parsed only as far as the cells read so far need.
+
+    The header row refers to the first few entries, so a file without the report
+    columns is rejected before the (often large) string table is parsed.
+    """
+
+    def __init__(self, zf):
+        self._textos = []
+        self._archivo = zf.open("xl/sharedStrings.xml") if "xl/sharedStrings.xml" in zf.namelist() else None
+        self._eventos = ElementTree.iterparse(self._archivo) if self._archivo else iter(())
+
+    def __getitem__(self, indice):
+        textos = self._textos
+        if indice >= len(textos):
+            # Parse ahead in growing batches so the body's lookups don't pay per string
+            hasta = max(indice + 1, 2 * len(textos), 16)
+            si = _NS + "si"
+            for _, elemento in self._eventos:
+                if elemento.tag == si:
+                    textos.append(_texto(elemento))
+                    elemento.clear()
+                    if len(textos) >= hasta:
+                        break
+            if indice >= len(textos):
+                raise IndexError(f"Shared string {indice} is not in the workbook")
+        return textos[indice]
+
+    def cerrar(self):
+        if self._archivo is not None:
+            self._archivo.close()
+
+
+def _estilos_fecha(zf):
+    # Indices of the cell styles (the "s" attribute) whose number format is a date/time
+    if "xl/styles.xml" not in zf.namelist():
+        return set()
+    with zf.open("xl/styles.xml") as f:
+        estilos = ElementTree.parse(f).getroot()
+    formatos = set(_FORMATOS_FECHA)
+    personalizados = estilos.find(_NS + "numFmts")
+    if personalizados is not None:
+        for formato in personalizados.findall(_NS + "numFmt"):
+            codigo = re.sub(r'"[^"]*"|\[[^\]]*\]|\\.', "", formato.get("formatCode", "")).lower()
+            if any(c in codigo for c in "dmyhs"):
+                formatos.add(int(formato.get("numFmtId")))
+    celdas = estilos.find(_NS + "cellXfs")
+    if celdas is None:
+        return set()
+    return {
+        str(i) for i, xf in enumerate(celdas.findall(_NS + "xf"))
+        if int(xf.get("numFmtId", 0)) in formatos
+    }
+
+
+def _conversor(compartidos, estilos_fecha, fecha_1904):
+    origen_fechas = datetime.datetime(1904, 1, 1) if fecha_1904 else datetime.datetime(1899, 12, 30)
+
+    def _convertir(tipo, estilo, texto):
+        if texto is None:
+            return None
+        if tipo == "s":
+            return compartidos[int(texto)]
+        if tipo in ("str", "d", "inlineStr"):
+            return texto
+        if tipo == "b":
+            return texto == "1"
+        if tipo == "e":
+            return None
+        if estilo in estilos_fecha:
+            return origen_fechas + datetime.timedelta(seconds=round(float(texto) * 86400))
+        return float(texto) if any(c in texto for c in ".eE") else int(texto)
+
+    return _convertir
+
+
+def _leer_celdas_regex(parte, convertir):
+    def _celda(atributos, cuerpo):
+        tipo = _ATRIBUTO_TIPO.search(atributos)
+        tipo = tipo.group(1).decode() if tipo else None
+        estilo = _ATRIBUTO_ESTILO.search(atributos)
+        estilo = estilo.group(1).decode() if estilo else None
+        if tipo == "inlineStr":
+            texto = b"".join(_TEXTO_EN_LINEA.findall(cuerpo))
+        else:
+            valor = _VALOR.search(cuerpo)
+            texto = valor.group(1) if valor else None
+        if texto is not None:
+            texto = html.unescape(texto.decode("utf-8"))
+        return convertir(tipo, estilo, texto)
+
+    # Dates, agents and shared-string indices repeat a lot, so identical cell
+    # markup is decoded once (bounded so huge files don't grow it forever)
+    decodificadas = {}
+    filas = {}
+    fila_encabezado = None
+    letras = None
+    vacia = [None] * len(COLUMNAS_REPORTE)
+    resto = b""
+    while True:
+        leido = parte.read(TAMANO_BLOQUE_XML)
+        bloque = resto + leido
+        # Cut after the last row tag so no cell is split between blocks
+        corte = len(bloque) if not leido else bloque.rfind(b"row>") + 4
+        if leido and corte < 4:
+            resto = bloque
+            continue
+        bloque, resto = bloque[:corte], bloque[corte:]
+        if _CELDA_SIN_REFERENCIA.search(bloque):
+            raise _SinReferencias()
+
+        if letras is None:
+            primera = _CELDA.search(bloque)
+            if primera is not None:
+                fila_encabezado = int(primera.group(2))
+                encabezado = {}
+                for letra, fila, atributos, cuerpo in _CELDA.findall(bloque, primera.start()):
+                    if int(fila) != fila_encabezado:
+                        break
+                    encabezado[_indice_columna(letra.decode())] = _celda(atributos, cuerpo)
+                orden = list(ubicar_columnas(encabezado).values())
+                letras = {_letra_columna(columna): pos for pos, columna in enumerate(orden)}
+                buscadas = re.compile(
+                    rb'<(?:\w+:)?c r="(' + b"|".join(letras) + rb')(\d+)"([^>]*?)(?:/>|>(.*?)</(?:\w+:)?c>)', re.S
+                )
+
+        if letras is not None:
+            for letra, fila, atributos, cuerpo in buscadas.findall(bloque):
+                fila = int(fila)
+                if fila <= fila_encabezado:
+                    continue
+                clave = (atributos, cuerpo)
+                if clave in decodificadas:
+                    valor = decodificadas[clave]
+                else:
+                    if len(decodificadas) > 100_000:
+                        decodificadas.clear()
+                    valor = decodificadas[clave] = _celda(atributos, cuerpo)
+                registro = filas.get(fila)
+                if registro is None:
+                    registro = filas[fila] = vacia.copy()
+                registro[letras[letra]] = valor
+        if not leido:
+            break
+
+    if letras is None:
+        ubicar_columnas({})
+    return [tuple(filas[fila]) for fila in sorted(filas)]
+
+
+def _letra_columna(indice):
+    letras = b""
+    indice += 1
+    while indice:
+        indice, resto = divmod(indice - 1, 26)
+        letras = bytes([65 + resto]) + letras
+    return letras
+
+
+def _leer_celdas_iterparse(parte, convertir):
+    celda_tag, fila_tag = _NS + "c", _NS + "row"
+    orden = None
+    filas = []
+    fila = {}
+    posicion = 0
+    for _, elemento in ElementTree.iterparse(parte):
+        if elemento.tag == celda_tag:
+            referencia = elemento.get("r")
+            columna = _indice_columna(referencia) if referencia else posicion
+            posicion = columna + 1
+            if orden is None or columna in orden:
+                tipo = elemento.get("t")
+                if tipo == "inlineStr":
+                    texto = _texto(elemento)
+                else:
+                    v = elemento.find(_NS + "v")
+                    texto = v.text if v is not None else None
+                fila[columna] = convertir(tipo, elemento.get("s"), texto)
+            elemento.clear()
+        elif elemento.tag == fila_tag:
+            if orden is None:
+                orden = list(ubicar_columnas(fila).values())
+            elif fila:
+                filas.append(tuple(fila.get(columna) for columna in orden))
+            fila = {}
+            posicion = 0
+            elemento.clear()
+    if orden is None:
+        ubicar_columnas({})
+    return filas
+
+
+def _leer_filas_xlsx(origen, hoja):
+    with zipfile.ZipFile(origen) as zf:
+        ruta, fecha_1904 = _partes_libro(zf, hoja)
+        compartidos = _TextosCompartidos(zf)
+        convertir = _conversor(compartidos, _estilos_fecha(zf), fecha_1904)
+        try:
+            with zf.open(ruta) as parte:
+                return _leer_celdas_regex(parte, convertir)
+        except _SinReferencias:
+            with zf.open(ruta) as parte:
+                return _leer_celdas_iterparse(parte, convertir)
+        finally:
+            compartidos.cerrar()
+
+
+def _texto_hora(valor):
+    # Time cells come back as datetimes on the Excel epoch; the analysis expects "%H:%M:%S" text
+    if isinstance(valor, (datetime.time, datetime.datetime)):
+        return valor.strftime("%H:%M:%S")
+    return valor
+
+
+def leer_xlsx(origen, hoja=None):
+    """Read the required columns of an .xlsx report with a streaming read-only parser.
+
+    Only the requested sheet (the first one by default, like ``pd.read_excel``) is
+    parsed and only the five report columns are decoded and kept. Date cells come
+    back as datetimes; text cells go through the same explicit parsers as a CSV.
+    """
+    valores = _leer_filas_xlsx(origen, hoja)
+    columnas = dict(zip(COLUMNAS_REPORTE, zip(*valores))) if valores else {col: () for col in COLUMNAS_REPORTE}
+    fecha = pd.Series(columnas["Fecha"], dtype=object)
+    if all(v is None or isinstance(v, datetime.datetime) for v in columnas["Fecha"]):
+        fecha = pd.to_datetime(fecha)
+    return aplicar_esquema(pd.DataFrame({
+        "Fecha": fecha,
+        "Tiempo": pd.Series([_texto_hora(v) for v in columnas["Tiempo"]], dtype=object),
+        "Al usuario": pd.Series([None if v is None else str(v) for v in columnas["Al usuario"]], dtype=object),
+        "Del usuario": pd.Series([None if v is None else str(v) for v in columnas["Del usuario"]], dtype=object),
+        "Depositar": pd.Series(columnas["Depositar"], dtype=object),
+    }))
+
+
+def leer_reporte(origen):
+    """Read a .csv or .xlsx report, picked by file name (``origen.name`` for uploads)."""
+    nombre = str(getattr(origen, "name", origen))
+    return leer_xlsx(origen) if nombre.lower().endswith(".xlsx") else leer_csv(origen)
+
+
+def analizar_csv_por_bloques(origen, vip_list, bonos, reglas=None,
+                             tamano_bloque=TAMANO_BLOQUE, conservar_detalle=False,
+                             fecha=None, comunidades=None, reglas_comunidad=COMUNIDADES_POR_DEFECTO,
+                             al_bloque=None):
+    """Streaming version of ``analizar_participacion`` for CSV reports.
+
+    Each chunk is matched and aggregated on its own and only the partial
+    aggregates are kept, so memory stays bounded by the chunk size. The per-deposit
+    ``df_resultado`` is only assembled when ``conservar_detalle`` is set; otherwise
+    ``None`` is returned in its place. ``fecha``/``comunidades`` are applied to each
+    chunk as it is read, before any matching. ``al_bloque(bloque, df_bloque)`` is
+    called with every parsed chunk and its matched deposits (to write them out,
+    count parse failures or report progress).
+    """
+    if reglas is None:
+        reglas = compilar_bonos(bonos)
+
+    parciales = []
+    detalle = []
+    with etapa("stream_analysis") as medicion:
+        medicion["filas"] = 0
+        for bloque in leer_csv_por_bloques(origen, tamano_bloque):
+            df_bloque = clasificar_depositos(
+                filtrar_reporte(bloque, fecha, comunidades, reglas_comunidad), reglas, reglas_comunidad
+            )
+            parciales.append(agregar_participacion(df_bloque))
+            if conservar_detalle:
+                detalle.append(df_bloque)
+            medicion["filas"] += len(bloque)
+            if al_bloque is not None:
+                al_bloque(bloque, df_bloque)
+
+    resumen = completar_resumen(combinar_parciales(parciales), vip_list)
+    df_resultado = None
+    if conservar_detalle:
+        df_resultado = concatenar_resultados(detalle) if detalle else clasificar_depositos(
+            pd.DataFrame(columns=COLUMNAS_REPORTE), reglas
+        )
+    return df_resultado, resumen
@@ -0,0 +1,131 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Background analyses shared by every session of the server. A job runs on a
+# worker thread of one process-wide pool, so a big upload doesn't freeze its own
+# page. The page that submitted it polls the ``Trabajo`` on later reruns and picks
+# the result up once it is done. Sessions submitting the same key while a job is
+# in flight share that job instead of starting another.
+#
+# Report parsing (the XLSX regex/iterparse reader, CSV chunk handling) is mostly
+# Python code holding the GIL, so concurrent jobs largely take turns rather than
+# run in parallel: MAX_TRABAJOS mainly bounds how many reports are held in memory
+# at once. Jobs beyond it wait in the pool's queue, in submission order, and
+# ``posicion_en_cola`` tells a page how many are ahead of its own.
+
+MAX_TRABAJOS = int(os.environ.get("VIP_WORKERS", 0)) or min(4, os.cpu_count() or 1)
+
+_pool = None
+_candado = threading.Lock()
+_en_curso = {}  # key -> unfinished Trabajo
+
+
+class TrabajoCancelado(Exception):
+    pass
+
+
+class Trabajo:
+    """One submitted job: its state, progress and, once finished, result or error.
+
+    ``estado`` goes from "pending" to "running" and ends as "done", "failed" or
+    "cancelled". The job function receives the ``Trabajo`` and calls ``avanzar``
+    to report progress; that is also where a cancellation takes effect. A job
+    shared by several sessions only stops once every one of them cancelled it.
+    """
+
+    def __init__(self, clave):
+        self.id = uuid.uuid4().hex[:8]
+        self.clave = clave
+        self.estado = "pending"
+        self.descripcion = "Waiting for a free worker"
+        self.hechas = 0
+        self.total = 0
+        self.unidad = "rows"
+        self.resultado = None
+        self.error = None
+        self.avisos = []
+        self.inicio = time.monotonic()
+        self.fin = None
+        self.suscriptores = 1
+        self._cancelado = threading.Event()
+
+    @property
+    def terminado(self):
+        return self.estado in ("done", "failed", "cancelled")
+
+    @property
+    def progreso(self):
+        """Fraction done, 0 to 1 (0 while the amount of work is unknown)."""
+        return min(self.hechas / self.total, 1.0) if self.total else 0.0
+
+    @property
+    def segundos(self):
+        return (self.fin or time.monotonic()) - self.inicio
+
+    def avanzar(self, descripcion=None, hechas=None, total=None, unidad=None):
+        if self._cancelado.is_set():
+            raise TrabajoCancelado()
+        if unidad is not None:
+            self.unidad = unidad
+        if descripcion is not None:
+            self.descripcion = descripcion
+        if total is not None:
+            self.total = total
+        if hechas is not None:
+            self.hechas = hechas
+
+    def cancelar(self):
+        """Drop one session's interest; with none left the job stops at its next
+        progress report (a queued job never starts)."""
+        with _candado:
+            self.suscriptores -= 1
+            if self.suscriptores <= 0:
+                self._cancelado.set()
+
+    def _correr(self, funcion, args):
+        try:
+            self.estado = "running"
+            self.avanzar("Starting")
+            self.resultado = funcion(self, *args)
+            self.estado = "done"
+        except TrabajoCancelado:
+            self.estado = "cancelled"
+        except Exception as e:
+            self.error = e
+            self.estado = "failed"
+        finally:
+            self.fin = time.monotonic()
+            with _candado:
+                if _en_curso.get(self.clave) is self:
+                    del _en_curso[self.clave]
+
+
+def enviar(clave, funcion, *args):
+    """Run ``funcion(trabajo, *args)`` in the background and return its ``Trabajo``.
+
+    If a job for ``clave`` is already in flight (and not cancelled) it is returned
+    instead, with one more subscriber.
+    """
+    global _pool
+    with _candado:
+        trabajo = _en_curso.get(clave)
+        if trabajo is not None and not trabajo._cancelado.is_set():
+            trabajo.suscriptores += 1
+            return trabajo
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=MAX_TRABAJOS, thread_name_prefix="vip-job")
+        trabajo = Trabajo(clave)
+        _en_curso[clave] = trabajo
+        _pool.submit(trabajo._correr, funcion, args)
+    return trabajo
+
+
+def posicion_en_cola(trabajo):
+    """Number of queued jobs submitted before ``trabajo`` (0 once it has started)."""
+    if trabajo.estado != "pending":
+        return 0
+    with _candado:
+        return sum(1 for otro in _en_curso.values() if otro.estado == "pending" and otro.inicio < trabajo.inicio)
@@ -0,0 +1,222 @@
+import datetime
+import os
+import time
+
+import pandas as pd
+from gspread.exceptions import APIError
+from gspread.utils import fill_gaps, numericise_all
+
+from analysis import formatear_resumen
+
+NOMBRE_LIBRO = "seguimiento_vip"
+HOJA_VIPS = "vip_list"
+HOJA_BONOS = "bonos_ofrecidos"
+HOJA_ACTIVIDAD = "actividad_diaria_vip"
+# Optional: community names and the "Del usuario" patterns that identify them
+HOJA_COMUNIDADES = "comunidades"
+
+# Last good copy of the reference sheets, tagged with the spreadsheet revision
+DIRECTORIO_SNAPSHOTS = os.environ.get("VIP_SNAPSHOTS_DIR", os.path.join("data", "snapshots"))
+ARCHIVO_SNAPSHOT = "referencias.pkl"
+
+# Layout written to actividad_diaria_vip, one row per (day, VIP, bonus)
+COLUMNAS_ACTIVIDAD = [
+    "Fecha", "Usuario", "Bono Usado", "Comunidad", "Monto Total",
+    "Hora de carga", "Veces que usó el bono", "% del Total",
+]
+
+
+def _letra_columna(numero):
+    letras = ""
+    while numero:
+        numero, resto = divmod(numero - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+
+def _clave_fecha(valor):
+    # Fecha cells can come back as "dd/mm/YYYY" text or, when someone typed a real
+    # date into the sheet, as a serial number
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return (datetime.datetime(1899, 12, 30) + datetime.timedelta(days=valor)).date()
+    try:
+        return datetime.datetime.strptime(str(valor).strip(), "%d/%m/%Y").date()
+    except ValueError:
+        return str(valor)
+
+
+def _columna(valores):
+    # A one-column range as a flat list ("" for the empty cells)
+    return [fila[0] if fila else "" for fila in valores]
+
+
+def exportar_actividad(hoja, actividad):
+    """Write per-day results to the actividad_diaria_vip worksheet.
+
+    ``actividad`` is the frame built by ``analysis.resumen_diario``; it is written in
+    its text form (``formatear_resumen``). Rows already in the sheet for the exported
+    days are replaced and every other row is kept, so exporting the same day twice
+    leaves a single copy. Only the header row and the Fecha column are read: days
+    not in the sheet yet are inserted after its last row, and otherwise only the
+    block from the first to the last row of those days is read and rewritten (its
+    other days' rows kept, rows no longer used blanked). Returns the number of rows
+    written for the exported days.
+    """
+    primera, columna_a = hoja.batch_get(["1:1", "A:A"], value_render_option="UNFORMATTED_VALUE")
+    con_encabezado = bool(primera) and "Fecha" in primera[0]
+    encabezado = list(primera[0]) if con_encabezado else list(COLUMNAS_ACTIVIDAD)
+    encabezado += [col for col in COLUMNAS_ACTIVIDAD if col not in encabezado]
+    posicion_fecha = encabezado.index("Fecha")
+    ultima_columna = _letra_columna(len(encabezado))
+    if len(encabezado) > hoja.col_count:
+        hoja.resize(cols=len(encabezado))
+
+    fechas_hoja = _columna(columna_a)
+    if posicion_fecha:
+        letra = _letra_columna(posicion_fecha + 1)
+        fechas_hoja = _columna(hoja.get(f"{letra}:{letra}", value_render_option="UNFORMATTED_VALUE"))
+    if not con_encabezado:
+        hoja.insert_rows([encabezado], row=1, value_input_option="RAW")
+        fechas_hoja.insert(0, "Fecha")
+    elif encabezado != primera[0]:
+        hoja.update(values=[encabezado], range_name=f"A1:{ultima_columna}1", value_input_option="RAW")
+
+    actividad = formatear_resumen(actividad)
+    fechas = set(actividad["Fecha"].map(_clave_fecha))
+    # Plain Python values (no NumPy scalars) so the request body serializes
+    nuevas = actividad.reindex(columns=encabezado).astype(object)
+    nuevas = nuevas.where(nuevas.notna(), "").to_numpy(dtype=object).tolist()
+
+    # 1-based sheet rows holding the exported days
+    del_dia = [i for i, v in enumerate(fechas_hoja[1:], start=2) if v != "" and _clave_fecha(v) in fechas]
+    if not del_dia:
+        if nuevas:
+            hoja.insert_rows(nuevas, row=len(fechas_hoja) + 1, value_input_option="RAW")
+        return len(nuevas)
+
+    desde, hasta = min(del_dia), max(del_dia)
+    alto = hasta - desde + 1
+    bloque = hoja.get(f"A{desde}:{ultima_columna}{hasta}", value_render_option="UNFORMATTED_VALUE")
+    conservadas = [
+        list(fila) + [""] * (len(encabezado) - len(fila))
+        for fila in bloque
+        if any(v != "" for v in fila)
+        and not (len(fila) > posicion_fecha and _clave_fecha(fila[posicion_fecha]) in fechas)
+    ]
+    tabla = conservadas + nuevas
+    tabla += [[""] * len(encabezado)] * (alto - len(tabla))
+    hoja.update(values=tabla[:alto], range_name=f"A{desde}:{ultima_columna}{hasta}", value_input_option="RAW")
+    if len(tabla) > alto:
+        hoja.insert_rows(tabla[alto:], row=hasta + 1, value_input_option="RAW")
+    return len(nuevas)
+
+
+def abrir_hojas(sh):
+    """Worksheet handles by title, resolved with a single metadata request."""
+    hojas = {ws.title: ws for ws in sh.worksheets()}
+    faltantes = [t for t in (HOJA_VIPS, HOJA_BONOS, HOJA_ACTIVIDAD) if t not in hojas]
+    if faltantes:
+        raise ValueError(f"Worksheets not found: {', '.join(faltantes)}")
+    return hojas
+
+
+def _registros(valores):
+    # Same frame Worksheet.get_all_records() would give: padded rows, numericised values
+    if not valores:
+        return pd.DataFrame()
+    filas = fill_gaps(valores)
+    encabezado = filas[0]
+    return pd.DataFrame([dict(zip(encabezado, numericise_all(fila))) for fila in filas[1:]])
+
+
+def descargar_referencias(sh, titulos=None):
+    """Fetch vip_list, bonos_ofrecidos and comunidades with one batched values request.
+
+    comunidades is optional; an empty frame is returned when the sheet doesn't exist.
+    ``titulos`` are the worksheet titles when already known (``abrir_hojas``).
+    Without them all three ranges are requested, and only if comunidades is missing
+    are the two required ones requested again.
+    """
+    hojas = [HOJA_VIPS, HOJA_BONOS]
+    if titulos is None or HOJA_COMUNIDADES in titulos:
+        hojas.append(HOJA_COMUNIDADES)
+    try:
+        respuesta = sh.values_batch_get([f"'{hoja}'" for hoja in hojas])
+    except APIError:
+        if titulos is not None:
+            raise
+        hojas.remove(HOJA_COMUNIDADES)
+        respuesta = sh.values_batch_get([f"'{hoja}'" for hoja in hojas])
+    tablas = [_registros(rango.get("values", [])) for rango in respuesta["valueRanges"]]
+    tablas += [pd.DataFrame()] * (3 - len(tablas))
+    return tuple(tablas)
+
+
+def _leer_snapshot(directorio):
+    ruta = os.path.join(directorio, ARCHIVO_SNAPSHOT)
+    if not os.path.exists(ruta):
+        return None
+    try:
+        return pd.read_pickle(ruta)
+    except Exception:
+        return None
+
+
+def _guardar_snapshot(snapshot, directorio):
+    os.makedirs(directorio, exist_ok=True)
+    ruta = os.path.join(directorio, ARCHIVO_SNAPSHOT)
+    pd.to_pickle(snapshot, ruta + ".tmp")
+    os.replace(ruta + ".tmp", ruta)
+
+
+def cargar_referencias(sh, directorio=DIRECTORIO_SNAPSHOTS, titulos=None):
+    """Return ``(vip_list, bonos, comunidades, estado)`` backed by an on-disk snapshot.
+
+    The spreadsheet's Drive modifiedTime is checked first (one cheap metadata call);
+    the sheets are only downloaded, in one batched request, when it differs from
+    the snapshot's revision (``titulos`` as in ``descargar_referencias``).
+    ``comunidades`` is empty when the spreadsheet has no such sheet
+    (``analysis.compilar_comunidades`` then uses the defaults).
+    If Sheets can't be reached (``sh`` is None or any call fails) the last good
+    snapshot is served instead. ``estado`` describes where the data came from:
+    origen ("snapshot", "sheets" or "offline"), revision, descargado (when the data
+    was fetched), latencia (seconds spent on the check/refresh) and error.
+    """
+    inicio = time.perf_counter()
+    snapshot = _leer_snapshot(directorio)
+    try:
+        if sh is None:
+            raise ConnectionError("Google Sheets connection unavailable")
+        revision = sh.get_lastUpdateTime()
+        if snapshot is not None and snapshot["revision"] == revision:
+            origen = "snapshot"
+        else:
+            vip_list, bonos, comunidades = descargar_referencias(sh, titulos)
+            snapshot = {
+                "revision": revision,
+                "descargado": datetime.datetime.now(datetime.timezone.utc),
+                "vip_list": vip_list,
+                "bonos": bonos,
+                "comunidades": comunidades,
+            }
+            try:
+                _guardar_snapshot(snapshot, directorio)
+            except OSError:
+                pass
+            origen = "sheets"
+        error = None
+    except Exception as e:
+        if snapshot is None:
+            raise
+        origen = "offline"
+        error = str(e)
+
+    estado = {
+        "origen": origen,
+        "revision": snapshot["revision"],
+        "descargado": snapshot["descargado"],
+        "latencia": time.perf_counter() - inicio,
+        "error": error,
+    }
+    # Snapshots written before the comunidades sheet existed don't carry it
+    return snapshot["vip_list"], snapshot["bonos"], snapshot.get("comunidades", pd.DataFrame()), estado
@@ -0,0 +1,112 @@
+import datetime
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from analysis import parse_unicos
+from ingestion import COLUMNAS_REPORTE
+
+# Ingested reports are kept as one Parquet file per report day and upload:
+#   <DIRECTORIO_REPORTES>/fecha=YYYY-MM-DD/<content hash>.parquet
+DIRECTORIO_REPORTES = os.environ.get("VIP_REPORTES_DIR", os.path.join("data", "reportes"))
+
+ESQUEMA_REPORTE = pa.schema([
+    ("Fecha", pa.timestamp("us")),
+    ("Tiempo", pa.string()),
+    ("Al usuario", pa.string()),
+    ("Del usuario", pa.string()),
+    ("Depositar", pa.float64()),
+])
+
+
+def _directorio_dia(dia, directorio):
+    return os.path.join(directorio, f"fecha={dia.isoformat()}")
+
+
+def _como_texto(serie):
+    return pd.Series(
+        [None if pd.isna(v) else v if isinstance(v, str) else str(v) for v in serie],
+        index=serie.index, dtype=object,
+    )
+
+
+def normalizar_reporte(df_reporte):
+    """Typed copy of the report columns: parsed Fecha, text columns and numeric Depositar."""
+    return pd.DataFrame({
+        "Fecha": parse_unicos(df_reporte["Fecha"], errors="coerce"),
+        "Tiempo": _como_texto(df_reporte["Tiempo"]),
+        "Al usuario": _como_texto(df_reporte["Al usuario"]),
+        "Del usuario": _como_texto(df_reporte["Del usuario"]),
+        "Depositar": pd.to_numeric(df_reporte["Depositar"], errors="coerce"),
+    })
+
+
+def guardar_reporte(df_reporte, huella, directorio=DIRECTORIO_REPORTES):
+    """Persist an ingested report, split by day, and return the days it covers.
+
+    Rows without a valid Fecha can't be assigned to a day and are not stored; the
+    analysis drops them anyway. Saving the same upload twice is a no-op.
+    """
+    normalizado = normalizar_reporte(df_reporte).dropna(subset=["Fecha"])
+    dias = []
+    for dia, filas in normalizado.groupby(normalizado["Fecha"].dt.date, sort=True):
+        destino = os.path.join(_directorio_dia(dia, directorio), f"{huella}.parquet")
+        dias.append(dia)
+        if os.path.exists(destino):
+            continue
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        tabla = pa.Table.from_pandas(filas, schema=ESQUEMA_REPORTE, preserve_index=False)
+        # Write then rename so a reader never sees a half-written file
+        temporal = destino + ".tmp"
+        pq.write_table(tabla, temporal)
+        os.replace(temporal, destino)
+    return dias
+
+
+def dias_guardados(directorio=DIRECTORIO_REPORTES):
+    if not os.path.isdir(directorio):
+        return []
+    dias = []
+    for nombre in os.listdir(directorio):
+        if nombre.startswith("fecha="):
+            try:
+                dias.append(datetime.date.fromisoformat(nombre[len("fecha="):]))
+            except ValueError:
+                continue
+    return sorted(dias)
+
+
+def _archivo_vigente(dia, directorio):
+    # A day re-exported later supersedes the earlier upload, so the newest file wins
+    carpeta = _directorio_dia(dia, directorio)
+    if not os.path.isdir(carpeta):
+        return None
+    archivos = [os.path.join(carpeta, f) for f in os.listdir(carpeta) if f.endswith(".parquet")]
+    return max(archivos, key=os.path.getmtime) if archivos else None
+
+
+def archivos_vigentes(desde, hasta=None, directorio=DIRECTORIO_REPORTES):
+    """Newest stored file of each day in an inclusive range of days, in day order."""
+    hasta = desde if hasta is None else hasta
+    archivos = (_archivo_vigente(dia, directorio) for dia in dias_guardados(directorio) if desde <= dia <= hasta)
+    return [archivo for archivo in archivos if archivo is not None]
+
+
+def leer_archivos(archivos, columnas=None):
+    """Concatenated report rows of stored files, memory-mapped, ``columnas`` only."""
+    columnas = COLUMNAS_REPORTE if columnas is None else columnas
+    tablas = [pq.read_table(archivo, columns=columnas, memory_map=True) for archivo in archivos]
+    if not tablas:
+        return ESQUEMA_REPORTE.empty_table().select(columnas).to_pandas()
+    return pa.concat_tables(tablas).to_pandas()
+
+
+def cargar_reportes(desde, hasta=None, columnas=None, directorio=DIRECTORIO_REPORTES):
+    """Load the stored report rows for one day or an inclusive range of days.
+
+    Files are memory-mapped and only ``columnas`` (all report columns by default)
+    are read.
+    """
+    return leer_archivos(archivos_vigentes(desde, hasta, directorio), columnas)
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+TAMANO_PAGINA = 100
+
+
+class TablaPaginada:
+    """Server-side view of a results frame for paginated display.
+
+    Search, filters and sorting are resolved on integer codes and cached sort
+    orders built lazily per column, and only the requested page is sliced out of
+    the frame. One instance is kept per analysis result, so the index is built
+    once and reused across reruns.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self._codigos = {}
+        self._ordenes = {}
+
+    def _categorias(self, columna):
+        # (codes, labels) per column; categoricals already carry them
+        if columna not in self._codigos:
+            serie = self.df[columna]
+            if isinstance(serie.dtype, pd.CategoricalDtype):
+                codigos = serie.cat.codes.to_numpy(dtype="int64")
+                etiquetas = serie.cat.categories
+            else:
+                codigos, etiquetas = pd.factorize(serie)
+            self._codigos[columna] = (codigos, pd.Index(etiquetas))
+        return self._codigos[columna]
+
+    def opciones(self, columna):
+        """Distinct values of ``columna``, sorted, for filter widgets."""
+        _, etiquetas = self._categorias(columna)
+        return sorted(etiquetas.tolist(), key=str)
+
+    def _orden(self, columna):
+        if columna not in self._ordenes:
+            serie = self.df[columna]
+            if isinstance(serie.dtype, pd.CategoricalDtype) or serie.dtype == object or pd.api.types.is_string_dtype(serie):
+                # Sort by label: rank the distinct labels once, then sort the row ranks
+                codigos, etiquetas = self._categorias(columna)
+                rango = np.empty(len(etiquetas) + 1, dtype="int64")
+                rango[:-1] = np.argsort(np.argsort(etiquetas.astype(str), kind="stable"), kind="stable")
+                rango[-1] = len(etiquetas)  # missing values last
+                claves = rango[codigos]
+            else:
+                claves = serie.to_numpy()
+            self._ordenes[columna] = np.argsort(claves, kind="stable")
+        return self._ordenes[columna]
+
+    def _coincidencias(self, columna, valores):
+        codigos, etiquetas = self._categorias(columna)
+        elegidos = np.append(etiquetas.isin(valores), False)
+        return elegidos[codigos]
+
+    def consultar(self, busqueda="", columna_busqueda=None, filtros=None, rangos=None,
+                  orden=None, descendente=False, pagina=1, tamano=TAMANO_PAGINA):
+        """Return ``(page, total)`` for the given search, filters and sort.
+
+        ``filtros`` maps a column to the values to keep (empty means no filter),
+        ``rangos`` maps a numeric column to an inclusive ``(min, max)``. ``pagina``
+        starts at 1 and is clamped to the last page; ``total`` is the number of
+        matching rows.
+        """
+        mascara = np.ones(len(self.df), dtype=bool)
+        if busqueda and columna_busqueda:
+            codigos, etiquetas = self._categorias(columna_busqueda)
+            coincide = etiquetas.astype(str).str.contains(busqueda, case=False, regex=False)
+            mascara &= np.append(np.asarray(coincide, dtype=bool), False)[codigos]
+        for columna, valores in (filtros or {}).items():
+            if valores:
+                mascara &= self._coincidencias(columna, valores)
+        for columna, (minimo, maximo) in (rangos or {}).items():
+            valores = self.df[columna].to_numpy()
+            mascara &= (valores >= minimo) & (valores <= maximo)
+
+        if orden is not None:
+            posiciones = self._orden(orden)
+            if descendente:
+                posiciones = posiciones[::-1]
+            posiciones = posiciones[mascara[posiciones]]
+        else:
+            posiciones = np.flatnonzero(mascara)
+
+        # A page past the end (e.g. after narrowing the filters) shows the last one
+        pagina = min(max(pagina, 1), max(-(-len(posiciones) // tamano), 1))
+        inicio = (pagina - 1) * tamano
+        return self.df.iloc[posiciones[inicio:inicio + tamano]], len(posiciones)
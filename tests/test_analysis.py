@@ -0,0 +1,220 @@
+import pandas as pd
+
+from analysis import (
+    analizar_incremental,
+    analizar_participacion,
+    formatear_resultado,
+    formatear_resumen,
+    parse_unicos,
+    resumen_diario,
+)
+from ingestion import leer_csv
+
+
+def test_porcentaje_como_antes_de_tipar():
+    bonos = pd.DataFrame({"Fecha": ["01/05/2024", "02/05/2024"], "Comunidad": ["Fenix"] * 2,
+                          "Hora inicio": ["0"] * 2, "Hora fin": ["23"] * 2, "Bono % base": ["10"] * 2})
+    reporte = pd.DataFrame({
+        "Fecha": ["2024-05-01", "2024-05-01", "2024-05-02"],
+        "Tiempo": ["10:00:00"] * 3,
+        "Al usuario": ["u1", "u2", "u1"],
+        "Del usuario": ["Fenix_1"] * 3,
+        "Depositar": [100.0, 0.0, 0.0],
+    })
+    vip_list = pd.DataFrame({"usuario": ["u1", "u2", "u3"]})
+    df_resultado, _ = analizar_participacion(reporte, vip_list, bonos)
+    diario = resumen_diario(df_resultado, vip_list)
+
+    texto = formatear_resumen(diario)
+    porcentajes = dict(zip(zip(texto["Fecha"], texto["Usuario"]), texto["% del Total"]))
+    # A zero deposit on a day with a positive total is a 0.0% share; a day whose
+    # total is 0 and the VIPs without deposits show 0%
+    assert porcentajes == {
+        ("01/05/2024", "u1"): "100.0%", ("01/05/2024", "u2"): "0.0%", ("01/05/2024", "u3"): "0%",
+        ("02/05/2024", "u1"): "0%", ("02/05/2024", "u2"): "0%", ("02/05/2024", "u3"): "0%",
+    }
+    # Tables and exports format a slice at a time
+    trozos = pd.concat([formatear_resumen(diario.iloc[[i]]) for i in range(len(diario))])
+    assert trozos["% del Total"].tolist() == texto["% del Total"].tolist()
+
+
+def test_parse_unicos_sin_ningun_valor():
+    fechas = parse_unicos(pd.Series([None, None], dtype=object), errors="coerce")
+    assert pd.api.types.is_datetime64_any_dtype(fechas)
+    assert fechas.isna().all()
+
+
+def test_reporte_sin_fechas_validas():
+    reporte = pd.DataFrame({
+        "Fecha": pd.Series([None, None], dtype=object),
+        "Tiempo": ["12:00:00", None],
+        "Al usuario": ["u1", "u2"],
+        "Del usuario": ["fenix_1", "fenix_2"],
+        "Depositar": [100.0, 50.0],
+    })
+    vip_list = pd.DataFrame({"usuario": ["u1", "u2"]})
+
+    df_resultado, resumen = analizar_participacion(reporte, vip_list, pd.DataFrame())
+
+    assert df_resultado.empty
+    assert sorted(resumen["Usuario"]) == ["u1", "u2"]
+    assert (resumen["Bono Usado"] == "No").all()
+
+
+_BONOS = pd.DataFrame({
+    "Fecha": ["01/05/2024"],
+    "Comunidad": ["Fenix"],
+    "Hora inicio": ["10"],
+    "Hora fin": ["14"],
+    "Mínimo carga": ["50"],
+    "Bono % base": ["10"],
+})
+
+
+def _exportacion(tmp_path, nombre, filas):
+    ruta = tmp_path / nombre
+    ruta.write_text("Fecha,Tiempo,Al usuario,Del usuario,Depositar\n" + "".join(f"{f}\n" for f in filas),
+                    encoding="utf-8")
+    return leer_csv(str(ruta))
+
+
+def test_incremental_con_montos_enteros_y_luego_decimales(tmp_path):
+    vip_list = pd.DataFrame({"usuario": ["u1", "u2"]})
+    filas = ["2024-05-01,11:00:00,u1,Fenix_1,100", "2024-05-01,12:00:00,u2,Fenix_1,60"]
+    primera = _exportacion(tmp_path, "primera.csv", filas)
+    segunda = _exportacion(tmp_path, "segunda.csv", filas + ["2024-05-01,13:00:00,u1,Fenix_1,70.5"])
+    assert primera["Depositar"].dtype != segunda["Depositar"].dtype
+
+    _, _, estado, _ = analizar_incremental(primera, vip_list, _BONOS)
+    _, _, _, filas_nuevas = analizar_incremental(segunda, vip_list, _BONOS, previo=estado)
+
+    assert filas_nuevas == 1
+
+
+_FILAS = [
+    "2024-05-01,11:00:00,u1,Fenix_1,100",
+    "2024-05-01,12:00:00,u2,Fenix_1,60",
+    "2024-05-01,12:00:00,u2,Fenix_1,60",
+    "2024-05-01,20:00:00,u1,Eros_2,80",
+]
+
+
+def test_incremental_solo_analiza_las_filas_nuevas(tmp_path):
+    vip_list = pd.DataFrame({"usuario": ["u1", "u2", "u3"]})
+    primera = _exportacion(tmp_path, "primera.csv", _FILAS)
+    segunda = _exportacion(tmp_path, "segunda.csv", _FILAS + ["2024-05-01,13:00:00,u2,Fenix_1,60",
+                                                              "2024-05-01,13:30:00,u3,Fenix_1,90"])
+
+    _, _, estado, _ = analizar_incremental(primera, vip_list, _BONOS)
+    df_resultado, resumen, _, filas_nuevas = analizar_incremental(segunda, vip_list, _BONOS, previo=estado)
+    completo, resumen_completo = analizar_participacion(segunda, vip_list, _BONOS)
+
+    assert filas_nuevas == 2
+    pd.testing.assert_frame_equal(df_resultado.reset_index(drop=True), completo.reset_index(drop=True))
+    pd.testing.assert_frame_equal(resumen.reset_index(drop=True), resumen_completo.reset_index(drop=True))
+
+
+def test_incremental_vuelve_a_analizar_todo_si_faltan_filas(tmp_path):
+    vip_list = pd.DataFrame({"usuario": ["u1", "u2"]})
+    primera = _exportacion(tmp_path, "primera.csv", _FILAS)
+    # One of the repeated deposits is gone, so this is not an extension of the first export
+    segunda = _exportacion(tmp_path, "segunda.csv", _FILAS[:2] + _FILAS[3:])
+
+    _, _, estado, _ = analizar_incremental(primera, vip_list, _BONOS)
+    df_resultado, resumen, _, filas_nuevas = analizar_incremental(segunda, vip_list, _BONOS, previo=estado)
+    completo, resumen_completo = analizar_participacion(segunda, vip_list, _BONOS)
+
+    assert filas_nuevas == len(segunda)
+    pd.testing.assert_frame_equal(df_resultado.reset_index(drop=True), completo.reset_index(drop=True))
+    pd.testing.assert_frame_equal(resumen.reset_index(drop=True), resumen_completo.reset_index(drop=True))
+
+
+def _referencia(df_reporte, vip_list, bonos):
+    # The row-by-row matching the vectorized analysis replaced, kept as the reference
+    df_reporte = df_reporte.copy()
+    df_reporte["Fecha"] = pd.to_datetime(df_reporte["Fecha"], errors="coerce")
+    df_reporte["Tiempo"] = pd.to_datetime(df_reporte["Tiempo"], format="%H:%M:%S", errors="coerce")
+    df_reporte["Hora"] = df_reporte["Tiempo"].dt.hour
+    df_reporte = df_reporte.dropna(subset=["Fecha", "Hora"])
+    resultados = []
+    for _, row in df_reporte.iterrows():
+        hora, monto, fecha = row["Hora"], row["Depositar"], row["Fecha"].date()
+        comunidad = "Fenix" if "Fenix" in row["Del usuario"] else "Eros" if "Eros" in row["Del usuario"] else ""
+        del_dia = bonos[(bonos["Fecha"] == fecha.strftime("%d/%m/%Y")) & (bonos["Comunidad"].str.lower() == comunidad.lower())]
+        participo, bono_usado = False, "No"
+        for _, b in del_dia.iterrows():
+            try:
+                h_ini = int(str(b["Hora inicio"]).split(":")[0].strip())
+                h_fin = int(str(b["Hora fin"]).split(":")[0].strip())
+            except ValueError:
+                continue
+            try:
+                min_carga = int(str(b["Mínimo carga"]).strip()) if b["Mínimo carga"] else 0
+            except ValueError:
+                min_carga = 0
+            try:
+                min_mejorado = int(str(b["Mínimo mejorado"]).strip()) if b["Mínimo mejorado"] else None
+            except ValueError:
+                min_mejorado = None
+            if h_ini <= hora <= h_fin:
+                if min_mejorado and monto >= min_mejorado:
+                    participo, bono_usado = True, f"{b['Bono % mejorado']}% ({comunidad})"
+                elif monto >= min_carga:
+                    participo, bono_usado = True, f"{b['Bono % base']}% ({comunidad})"
+        resultados.append({
+            "Fecha": fecha.strftime("%d/%m/%Y"), "Usuario": row["Al usuario"], "Comunidad": comunidad,
+            "Monto": monto, "Hora de carga": row["Tiempo"].strftime("%H:%M:%S"),
+            "Bono Usado": bono_usado, "Participó": "✅" if participo else "❌",
+        })
+    df_resultado = pd.DataFrame(resultados)
+    resumen = df_resultado[df_resultado["Participó"] == "✅"].groupby(
+        ["Usuario", "Bono Usado", "Comunidad"], as_index=False
+    ).agg({"Monto": "sum", "Hora de carga": "last", "Participó": "count"})
+    resumen.columns = ["Usuario", "Bono Usado", "Comunidad", "Monto Total", "Hora de carga", "Veces que usó el bono"]
+    total = resumen["Monto Total"].sum()
+    resumen["% del Total"] = (resumen["Monto Total"] / total * 100).round(2).astype(str) + "%"
+    faltantes = [u for u in vip_list["usuario"] if u not in set(resumen["Usuario"])]
+    resumen = pd.concat([resumen, pd.DataFrame({
+        "Usuario": faltantes, "Bono Usado": "No", "Comunidad": "", "Monto Total": 0,
+        "Hora de carga": "", "Veces que usó el bono": 0, "% del Total": "0%",
+    })], ignore_index=True)
+    return df_resultado, resumen
+
+
+def test_coincide_con_el_analisis_fila_por_fila():
+    bonos = pd.DataFrame({
+        "Fecha": ["01/05/2024", "01/05/2024", "01/05/2024", "02/05/2024", "01/05/2024"],
+        "Comunidad": ["Fenix", "Fenix", "Eros", "Fenix", ""],
+        "Hora inicio": ["10:00", "12", "20", "0", "0"],
+        "Hora fin": ["14:00", "13", "23", "23", "23"],
+        "Mínimo carga": ["50", "", "100", "x", ""],
+        "Mínimo mejorado": ["200", "", "", "", ""],
+        "Bono % base": ["10", "15", "20", "5", "99"],
+        "Bono % mejorado": ["25", "", "", "", ""],
+    })
+    reporte = pd.DataFrame([
+        ("2024-05-01", "09:59:59", "u1", "Fenix_1", 500.0),  # before the hour range
+        ("2024-05-01", "10:00:00", "u1", "Fenix_1", 60.0),   # first hour, base tier
+        ("2024-05-01", "11:30:00", "u2", "Fenix_1", 250.0),  # improved tier
+        ("2024-05-01", "11:00:00", "u2", "Fenix_1", 40.0),   # below the minimum
+        ("2024-05-01", "12:15:00", "u3", "Fenix_2", 250.0),  # two bonuses match: the last one wins
+        ("2024-05-01", "14:59:00", "u3", "Fenix_2", 70.0),   # last hour of the range
+        ("2024-05-01", "15:00:00", "u3", "Fenix_2", 70.0),   # after the hour range
+        ("2024-05-01", "21:00:00", "u4", "Eros_1", 100.0),
+        ("2024-05-01", "21:00:00", "u4", "Eros_1", 99.0),
+        ("2024-05-01", "12:00:00", "u5", "otro", 300.0),     # unknown sender: the empty community
+        ("2024-05-02", "08:00:00", "u1", "Fenix_1", 10.0),   # unparseable minimum counts as 0
+        ("2024-05-03", "08:00:00", "u1", "Fenix_1", 10.0),   # no bonus that day
+        ("2024-05-01", "25:00:00", "u1", "Fenix_1", 10.0),   # invalid time, left out
+    ], columns=["Fecha", "Tiempo", "Al usuario", "Del usuario", "Depositar"])
+    vip_list = pd.DataFrame({"usuario": ["u1", "u2", "u3", "u6"]})  # u6 made no deposit
+
+    esperado, resumen_esperado = _referencia(reporte, vip_list, bonos)
+    df_resultado, resumen = analizar_participacion(reporte.copy(), vip_list, bonos)
+
+    pd.testing.assert_frame_equal(formatear_resultado(df_resultado).reset_index(drop=True), esperado,
+                                  check_dtype=False)
+    claves = ["Usuario", "Bono Usado"]
+    texto = formatear_resumen(resumen).sort_values(claves).reset_index(drop=True)
+    resumen_esperado = resumen_esperado.sort_values(claves).reset_index(drop=True)
+    pd.testing.assert_frame_equal(texto, resumen_esperado, check_dtype=False)
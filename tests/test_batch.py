@@ -0,0 +1,16 @@
+import pandas as pd
+
+from batch import procesar_lote
+
+
+def test_lote_sin_filas_escribe_resumen_vacio(tmp_path):
+    reporte = tmp_path / "vacio.csv"
+    reporte.write_text("Fecha,Tiempo,Al usuario,Del usuario,Depositar\n", encoding="utf-8")
+    salida = tmp_path / "salida"
+
+    combinado, fallidos = procesar_lote([str(reporte)], str(salida), pd.DataFrame({"usuario": ["u1"]}),
+                                        pd.DataFrame(), workers=1, historial=str(tmp_path / "h.db"))
+
+    assert fallidos == []
+    assert combinado.empty
+    assert (salida / "resumen.csv").exists()
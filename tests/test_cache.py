@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+from cache import CacheCompartida, tamano_en_memoria
+
+
+def test_frame_compartido_se_cuenta_una_vez():
+    df = pd.DataFrame({"a": np.arange(1000)})
+    tamano = tamano_en_memoria(df)
+    cache = CacheCompartida(10 * tamano)
+
+    cache.guardar("analisis", {"df_resultado": df, "copia": [df]})
+    cache.guardar("estado", {"df_resultado": df, "huellas": np.zeros(10, dtype="uint64")})
+    assert cache.usado == tamano + 80
+
+    cache.guardar("analisis", {"otro": df.copy()})
+    assert cache.usado == 2 * tamano + 80
+
+
+def test_desalojo_libera_solo_lo_que_nadie_mas_usa():
+    df = pd.DataFrame({"a": np.arange(1000)})
+    tamano = tamano_en_memoria(df)
+    cache = CacheCompartida(2.5 * tamano)
+
+    cache.guardar("uno", {"df": df})
+    cache.guardar("dos", {"df": df, "extra": df.copy()})
+    cache.guardar("tres", {"otro": df.copy()})
+
+    assert cache.obtener("uno") is None
+    assert cache.desalojos == 2
+    assert cache.usado == tamano
@@ -0,0 +1,13 @@
+import pandas as pd
+
+from charts import CATEGORIAS_RADAR, figura_radar
+
+
+def test_radar_con_mas_comunidades_que_colores_base():
+    comunidades = [f"Comunidad {i}" for i in range(12)]
+    radar = pd.DataFrame(0.5, index=comunidades, columns=CATEGORIAS_RADAR)
+
+    fig = figura_radar(radar)
+
+    assert [traza.name for traza in fig.data] == comunidades
+    assert all(traza.line.color for traza in fig.data)
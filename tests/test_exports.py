@@ -0,0 +1,53 @@
+import os
+
+import pandas as pd
+
+import exports
+from analysis import formatear_resumen
+from exports import exportar
+
+
+def _resumen():
+    # Numeric VIP ids (as get_all_records returns them) next to report text users,
+    # and a label column that is all missing in the first slice
+    return pd.DataFrame({
+        "Usuario": pd.Series([12345, "vip", 7], dtype=object),
+        "Bono Usado": ["No", "10% (Fenix)", "No"],
+        "Comunidad": [None, None, "Fenix"],
+        "Monto Total": [0.0, 5.0, 1.0],
+        "Hora de carga": pd.to_timedelta([None, "01:00:00", None]),
+        "Veces que usó el bono": [0, 1, 0],
+        "% del Total": [0.0, 100.0, 0.0],
+    })
+
+
+def test_parquet_con_usuarios_numericos_y_texto(tmp_path):
+    ruta = exportar(_resumen(), formatear_resumen, "parquet", "v1", "resumen", str(tmp_path), tamano=2)
+
+    leido = pd.read_parquet(ruta)
+    assert leido["Usuario"].tolist() == ["12345", "vip", "7"]
+    assert leido["Comunidad"].tolist()[2] == "Fenix"
+    assert pd.api.types.is_timedelta64_dtype(leido["Hora de carga"])
+
+
+def test_xlsx_reparte_filas_que_exceden_una_hoja(tmp_path, monkeypatch):
+    monkeypatch.setattr(exports, "MAX_FILAS_XLSX", 3)  # header + 2 rows per sheet
+    df = pd.DataFrame({"Usuario": [f"u{i}" for i in range(5)], "Monto Total": range(5)})
+
+    ruta = exportar(df, lambda trozo: trozo, "xlsx", "v1", "resultado", str(tmp_path), tamano=1)
+
+    hojas = pd.read_excel(ruta, sheet_name=None)
+    assert list(hojas) == ["Data", "Data 2", "Data 3"]
+    assert pd.concat(hojas.values(), ignore_index=True)["Usuario"].tolist() == df["Usuario"].tolist()
+
+
+def test_poda_descarta_candados_de_versiones_borradas(tmp_path, monkeypatch):
+    monkeypatch.setattr(exports, "MAX_VERSIONES", 2)
+    df = pd.DataFrame({"a": [1]})
+
+    for i, version in enumerate(["v1", "v2", "v3"]):
+        exportar(df, lambda trozo: trozo, "csv", version, "r", str(tmp_path))
+        os.utime(tmp_path / version, (i, i))
+
+    versiones = {os.path.basename(os.path.dirname(r)) for r in exports._candados if r.startswith(str(tmp_path))}
+    assert versiones == {"v2", "v3"}
@@ -0,0 +1,42 @@
+import datetime
+
+import pandas as pd
+
+from history import bonos_vip, comunidades_historial, guardar_historial, rango_historial, tendencia_vip
+
+
+def _diario(fecha, montos):
+    # A resumen_diario with one participation row per VIP, plus a non-participant
+    usuarios = list(montos)
+    return pd.DataFrame({
+        "Fecha": pd.to_datetime([fecha] * (len(usuarios) + 1)),
+        "Usuario": usuarios + ["u9"],
+        "Bono Usado": ["10% (Fenix)"] * len(usuarios) + ["No"],
+        "Comunidad": ["Fenix"] * len(usuarios) + [""],
+        "Monto Total": list(montos.values()) + [0.0],
+        "Hora de carga": pd.to_timedelta(["12:00:00"] * len(usuarios) + [None]),
+        "Veces que usó el bono": [1] * len(usuarios) + [0],
+        "% del Total": [50.0] * len(usuarios) + [0.0],
+    })
+
+
+def test_guardar_reemplaza_el_dia_y_consulta_tendencias(tmp_path):
+    archivo = str(tmp_path / "historial.sqlite")
+    dia1, dia2, dia3 = (datetime.date(2024, 5, d) for d in (1, 2, 3))
+
+    guardar_historial(_diario("2024-05-01", {"u1": 100.0, "u2": 100.0}), archivo)
+    guardar_historial(_diario("2024-05-02", {"u2": 30.0}), archivo)
+    # A later export of the first day replaces it instead of adding to it
+    guardar_historial(_diario("2024-05-01", {"u1": 70.0}), archivo)
+
+    assert rango_historial(archivo) == (dia1, dia2)
+    assert comunidades_historial(archivo) == ["Fenix"]
+    tendencia = tendencia_vip("u1", dia1, dia3, archivo)
+    assert tendencia["monto"].tolist() == [70.0, 0.0]  # u1 had no activity on the 2nd
+    assert bonos_vip("u2", dia1, dia3, archivo)[["bono", "usos"]].values.tolist() == [["10% (Fenix)", 1]]
+
+
+def test_historial_inexistente(tmp_path):
+    archivo = str(tmp_path / "no_existe.sqlite")
+    assert rango_historial(archivo) is None
+    assert tendencia_vip("u1", datetime.date(2024, 5, 1), datetime.date(2024, 5, 2), archivo).empty
@@ -0,0 +1,36 @@
+import zipfile
+
+import openpyxl
+import pytest
+
+from ingestion import aviso_conversion, leer_xlsx
+
+_SST = '<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">{}</sst>'
+
+
+def test_xlsx_sin_columnas_falla_antes_de_leer_los_textos(tmp_path):
+    # Header cells point at the first shared strings; the table is broken well past
+    # them, so reading it all would raise a parse error instead
+    libro = openpyxl.Workbook()
+    libro.active.append(["Fecha", "Tiempo", "Al usuario", "Del usuario", "Otra"])
+    libro.save(tmp_path / "base.xlsx")
+    encabezado = "".join(
+        f'<c r="{letra}1" t="s"><v>{i}</v></c>' for i, letra in enumerate("ABCDE"))
+    hoja = ('<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+            f'<sheetData><row r="1">{encabezado}</row></sheetData></worksheet>')
+    textos = "".join(f"<si><t>{t}</t></si>" for t in ["Fecha", "Tiempo", "Al usuario", "Del usuario", "Otra"])
+    ruta = tmp_path / "reporte.xlsx"
+    with zipfile.ZipFile(tmp_path / "base.xlsx") as origen, zipfile.ZipFile(ruta, "w") as destino:
+        for nombre in origen.namelist():
+            if nombre not in ("xl/worksheets/sheet1.xml", "xl/sharedStrings.xml"):
+                destino.writestr(nombre, origen.read(nombre))
+        destino.writestr("xl/worksheets/sheet1.xml", hoja)
+        destino.writestr("xl/sharedStrings.xml", _SST.format(textos + "<si><t>relleno</t></si>" * 10_000 + "<si><t>roto"))
+
+    with pytest.raises(ValueError, match="Depositar"):
+        leer_xlsx(ruta)
+
+
+def test_aviso_menciona_tiempo():
+    assert "Tiempo" in aviso_conversion({"Tiempo": 3})
+    assert aviso_conversion({}) is None
@@ -0,0 +1,60 @@
+import threading
+import time
+import uuid
+
+from jobs import enviar
+
+
+def _esperar(trabajo, limite=5):
+    fin = time.monotonic() + limite
+    while not trabajo.terminado and time.monotonic() < fin:
+        time.sleep(0.01)
+    return trabajo
+
+
+def test_resultado_y_progreso():
+    liberar = threading.Event()
+
+    def sumar(trabajo, n):
+        trabajo.avanzar("Adding", hechas=n // 2, total=n)
+        liberar.wait(5)
+        return sum(range(n))
+
+    trabajo = enviar(uuid.uuid4().hex, sumar, 10)
+    fin = time.monotonic() + 5
+    while trabajo.hechas == 0 and time.monotonic() < fin:
+        time.sleep(0.01)
+    assert (trabajo.estado, trabajo.descripcion, trabajo.progreso) == ("running", "Adding", 0.5)
+    liberar.set()
+
+    assert _esperar(trabajo).estado == "done"
+    assert trabajo.resultado == 45
+
+
+def test_error_queda_en_el_trabajo():
+    def fallar(trabajo):
+        raise ValueError("bad report")
+
+    trabajo = _esperar(enviar(uuid.uuid4().hex, fallar))
+    assert trabajo.estado == "failed"
+    assert str(trabajo.error) == "bad report"
+
+
+def test_misma_clave_comparte_el_trabajo_y_cancelar():
+    liberar = threading.Event()
+
+    def esperar(trabajo):
+        while not liberar.wait(0.01):
+            trabajo.avanzar()
+
+    clave = uuid.uuid4().hex
+    trabajo = enviar(clave, esperar)
+    assert enviar(clave, esperar) is trabajo
+
+    # Still wanted by the second session after the first one cancels
+    trabajo.cancelar()
+    time.sleep(0.05)
+    assert not trabajo.terminado
+    trabajo.cancelar()
+    assert _esperar(trabajo).estado == "cancelled"
+    liberar.set()
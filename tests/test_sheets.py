@@ -0,0 +1,131 @@
+import pandas as pd
+from gspread.utils import a1_range_to_grid_range
+
+from analysis import COLUMNAS_RESUMEN
+from sheets import COLUMNAS_ACTIVIDAD, exportar_actividad
+
+
+class HojaFalsa:
+    """In-memory stand-in for the gspread Worksheet calls exportar_actividad makes."""
+
+    def __init__(self, filas, col_count=26):
+        self.filas = [list(fila) for fila in filas]
+        self.row_count = max(len(self.filas), 1000)
+        self.col_count = col_count
+        self.escrituras = []
+
+    def _leer(self, rango):
+        grid = a1_range_to_grid_range(rango)
+        filas = self.filas[grid.get("startRowIndex", 0):grid.get("endRowIndex", len(self.filas))]
+        valores = [fila[grid.get("startColumnIndex", 0):grid.get("endColumnIndex", len(fila))] for fila in filas]
+        # Like the API: trailing empty cells and rows are left out
+        valores = [fila[:max([i + 1 for i, v in enumerate(fila) if v != ""], default=0)] for fila in valores]
+        while valores and not valores[-1]:
+            valores.pop()
+        return valores
+
+    def batch_get(self, rangos, value_render_option=None):
+        return [self._leer(rango) for rango in rangos]
+
+    def get(self, rango, value_render_option=None):
+        return self._leer(rango)
+
+    def update(self, values, range_name, value_input_option=None):
+        self.escrituras.append(("update", range_name))
+        grid = a1_range_to_grid_range(range_name)
+        for i, fila in enumerate(values, start=grid["startRowIndex"]):
+            while len(self.filas) <= i:
+                self.filas.append([])
+            actual = self.filas[i] + [""] * (grid["startColumnIndex"] + len(fila) - len(self.filas[i]))
+            actual[grid["startColumnIndex"]:grid["startColumnIndex"] + len(fila)] = fila
+            self.filas[i] = actual
+
+    def insert_rows(self, values, row=1, value_input_option=None):
+        self.escrituras.append(("insert", row, len(values)))
+        while len(self.filas) < row - 1:
+            self.filas.append([])
+        self.filas[row - 1:row - 1] = [list(fila) for fila in values]
+
+    def resize(self, rows=None, cols=None):
+        self.col_count = cols or self.col_count
+
+    def dia(self, fecha):
+        return [fila for fila in self.filas[1:] if fila and fila[0] == fecha]
+
+
+def _fila(fecha, usuario, usos=1):
+    return [fecha, usuario, "10% (Fenix)", "Fenix", 100.0, "10:00:00", usos, "100.0%"]
+
+
+def _actividad(fecha, usuarios):
+    return pd.DataFrame({
+        "Fecha": pd.Timestamp(fecha),
+        "Usuario": usuarios,
+        "Bono Usado": "10% (Fenix)",
+        "Comunidad": "Fenix",
+        "Monto Total": 100.0,
+        "Hora de carga": pd.Timedelta(hours=10),
+        "Veces que usó el bono": 5,
+        "% del Total": 100.0,
+    }, columns=["Fecha"] + COLUMNAS_RESUMEN)
+
+
+def _hoja():
+    return HojaFalsa([
+        COLUMNAS_ACTIVIDAD,
+        _fila("10/03/2025", "a"),
+        _fila("10/03/2025", "b"),
+        _fila("11/03/2025", "c"),
+        _fila("12/03/2025", "d"),
+    ])
+
+
+def test_reemplaza_el_mismo_dia_y_deja_filas_en_blanco():
+    hoja = _hoja()
+
+    escritas = exportar_actividad(hoja, _actividad("2025-03-10", ["z"]))
+
+    assert escritas == 1
+    assert [fila[1] for fila in hoja.dia("10/03/2025")] == ["z"]
+    assert hoja.dia("10/03/2025")[0][6] == 5
+    # The block shrank from two rows to one: the leftover row is blanked, not shifted
+    assert hoja.filas[2] == [""] * len(COLUMNAS_ACTIVIDAD)
+    assert len(hoja.filas) == 5
+    # Only the day's block was written
+    assert hoja.escrituras == [("update", "A2:H3")]
+
+
+def test_conserva_los_otros_dias():
+    hoja = _hoja()
+
+    exportar_actividad(hoja, pd.concat([_actividad("2025-03-10", ["x"]), _actividad("2025-03-12", ["y"])]))
+
+    assert [fila[1] for fila in hoja.dia("11/03/2025")] == ["c"]
+    assert [fila[1] for fila in hoja.dia("10/03/2025")] == ["x"]
+    assert [fila[1] for fila in hoja.dia("12/03/2025")] == ["y"]
+
+
+def test_dia_nuevo_se_inserta_al_final():
+    hoja = _hoja()
+
+    exportar_actividad(hoja, _actividad("2025-03-13", ["n1", "n2"]))
+
+    assert hoja.escrituras == [("insert", 6, 2)]
+    assert [fila[1] for fila in hoja.filas[1:]] == ["a", "b", "c", "d", "n1", "n2"]
+
+
+def test_bloque_que_crece_inserta_las_filas_sobrantes():
+    hoja = _hoja()
+
+    exportar_actividad(hoja, _actividad("2025-03-10", ["p", "q", "r"]))
+
+    assert [fila[1] for fila in hoja.filas[1:]] == ["p", "q", "r", "c", "d"]
+
+
+def test_hoja_vacia_recibe_encabezado():
+    hoja = HojaFalsa([])
+
+    exportar_actividad(hoja, _actividad("2025-03-10", ["a"]))
+
+    assert hoja.filas[0] == COLUMNAS_ACTIVIDAD
+    assert [fila[1] for fila in hoja.dia("10/03/2025")] == ["a"]
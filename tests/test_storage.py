@@ -0,0 +1,29 @@
+import datetime
+import os
+
+import pandas as pd
+
+from storage import archivos_vigentes, cargar_reportes, guardar_reporte
+
+
+def _reporte(usuarios):
+    return pd.DataFrame({
+        "Fecha": ["2024-05-01"] * len(usuarios),
+        "Tiempo": ["12:00:00"] * len(usuarios),
+        "Al usuario": usuarios,
+        "Del usuario": ["fenix_1"] * len(usuarios),
+        "Depositar": [100.0] * len(usuarios),
+    })
+
+
+def test_exportacion_posterior_reemplaza_el_dia(tmp_path):
+    dia = datetime.date(2024, 5, 1)
+    guardar_reporte(_reporte(["u1"]), "primera", str(tmp_path))
+    anterior = archivos_vigentes(dia, dia, str(tmp_path))
+    os.utime(anterior[0], (0, 0))
+
+    guardar_reporte(_reporte(["u1", "u2"]), "segunda", str(tmp_path))
+
+    vigentes = archivos_vigentes(dia, dia, str(tmp_path))
+    assert [os.path.basename(ruta) for ruta in vigentes] == ["segunda.parquet"]
+    assert cargar_reportes(dia, directorio=str(tmp_path))["Al usuario"].tolist() == ["u1", "u2"]
@@ -0,0 +1,42 @@
+import pandas as pd
+
+from tables import TablaPaginada
+
+
+def _tabla():
+    return TablaPaginada(pd.DataFrame({
+        "Usuario": pd.Series(["ana", "bea", None, "carla", "dani"], dtype=object),
+        "Comunidad": pd.Categorical(["Fenix", "Eros", "Fenix", "Fenix", "Eros"]),
+        "Monto Total": [50.0, 10.0, 30.0, 40.0, 20.0],
+    }))
+
+
+def test_paginas_y_ultima_pagina():
+    tabla = _tabla()
+
+    pagina, total = tabla.consultar(pagina=2, tamano=2)
+    assert total == 5
+    assert pagina["Usuario"].tolist() == [None, "carla"]
+
+    # Past the end shows the last page
+    pagina, _ = tabla.consultar(pagina=9, tamano=2)
+    assert pagina["Usuario"].tolist() == ["dani"]
+
+
+def test_orden_filtros_y_busqueda():
+    tabla = _tabla()
+
+    pagina, _ = tabla.consultar(orden="Monto Total", descendente=True)
+    assert pagina["Monto Total"].tolist() == [50.0, 40.0, 30.0, 20.0, 10.0]
+
+    # Text sorts by label with missing values last
+    pagina, _ = tabla.consultar(orden="Usuario")
+    assert pagina["Usuario"].tolist() == ["ana", "bea", "carla", "dani", None]
+
+    pagina, total = tabla.consultar(filtros={"Comunidad": ["Fenix"]}, rangos={"Monto Total": (35, 60)},
+                                    orden="Monto Total")
+    assert (pagina["Usuario"].tolist(), total) == (["carla", "ana"], 2)
+
+    pagina, total = tabla.consultar(busqueda="A", columna_busqueda="Usuario", filtros={"Comunidad": []})
+    assert total == 4
+    assert tabla.opciones("Comunidad") == ["Eros", "Fenix"]